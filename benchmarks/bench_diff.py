@@ -0,0 +1,86 @@
+'''Benchmark diff() and patch() on configurations with 100k settings
+
+``legacy_diff`` is the plain recursive comparison formerly used by
+``ConfigWatcher``.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import re
+
+import configgen
+import libconf
+
+
+def legacy_diff(old, new, path=()):
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        if old == new and type(old) is type(new):
+            return []
+        return [('changed', path, old, new)]
+
+    changes = []
+    for name, value in old.items():
+        if name not in new:
+            changes.append(('removed', path + (name,), value, None))
+    for name, value in new.items():
+        if name not in old:
+            changes.append(('added', path + (name,), None, value))
+        else:
+            changes.extend(legacy_diff(old[name], value, path + (name,)))
+    return changes
+
+
+def count_settings(value):
+    if isinstance(value, dict):
+        return len(value) + sum(count_settings(v) for v in value.values())
+    if isinstance(value, tuple):
+        return sum(count_settings(v) for v in value)
+    return 0
+
+
+def with_changed_ports(data, n_changes, n_groups):
+    '''Change the ports of ``n_changes`` groups spread over the input'''
+    step = n_groups // max(n_changes, 1)
+    changed = set(range(0, step * n_changes, step))
+
+    def replace(m):
+        i = int(m.group(1)) - 1024
+        return u'port = %d;' % (99999 - i if i in changed else 1024 + i,)
+
+    return re.sub(u'port = (\\d+);', replace, data)
+
+
+def main():
+    n_groups = 11112
+    data = configgen.generate_config(n_groups)
+    a = libconf.load(io.StringIO(data))
+    print("Settings: %d" % (count_settings(a),))
+
+    for n_changes in [0, 10, 1000]:
+        b = libconf.load(io.StringIO(with_changed_ports(data, n_changes,
+                                                        n_groups)))
+        changes = libconf.diff(a, b)
+        assert len(changes) == n_changes
+        assert len(legacy_diff(a, b)) == n_changes
+        print("%4d changes, legacy diff:         %.3f s" %
+              (n_changes,
+               configgen.best_of(lambda: legacy_diff(a, b), repeat=7)))
+        print("%4d changes, diff:                %.3f s" %
+              (n_changes,
+               configgen.best_of(lambda: libconf.diff(a, b), repeat=7)))
+        if not changes:
+            continue
+
+        print("%4d changes, patch:               %.3f s" %
+              (n_changes,
+               configgen.best_of(lambda: libconf.patch(a, changes))))
+        patched = libconf.patch(a, changes)
+        assert patched == b
+        print("%4d changes, diff against patch:  %.3f s" %
+              (n_changes,
+               configgen.best_of(lambda: libconf.diff(a, patched))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''Compare cold and warm process start with load(..., cache_dir=...)
+
+Each measurement runs in a fresh interpreter, so only the on-disk cache can
+be reused between runs.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import configgen
+
+
+def measure(path, cache_dir):
+    '''Load ``path`` in this process and print the time it took'''
+    import libconf
+
+    start = time.time()
+    with io.open(path, 'r', encoding='utf-8') as f:
+        libconf.load(f, cache_dir=cache_dir or None)
+    print(time.time() - start)
+
+
+def run(path, cache_dir):
+    out = subprocess.check_output(
+        [sys.executable, __file__, '--measure', path, cache_dir])
+    return float(out)
+
+
+def main():
+    if sys.argv[1:2] == ['--measure']:
+        return measure(*sys.argv[2:])
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'input.cfg')
+        cache_dir = os.path.join(tmpdir, 'cache')
+        data = configgen.generate_config(20000)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        print("Input: %.1f MB" % (len(data) / 1e6,))
+
+        print("no cache:    %.3f s" % min(run(path, '') for _ in range(3)))
+        cold = []
+        for _ in range(3):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cold.append(run(path, cache_dir))
+        print("cold cache:  %.3f s" % min(cold))
+        print("warm cache:  %.3f s" % min(run(path, cache_dir)
+                                          for _ in range(3)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+'''Compare dumps() with the former write-per-value dump engine
+
+``legacy_dumps`` reproduces the previous implementation, which formatted
+every value separately and wrote it to an ``io.StringIO``.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+
+import configgen
+import libconf
+
+
+def legacy_dump_value(key, value, f, indent=0):
+    spaces = ' ' * indent
+
+    if key is None:
+        key_prefix = ''
+        key_prefix_nl = ''
+    else:
+        key_prefix = key + ' = '
+        key_prefix_nl = key + ' =\n' + spaces
+
+    dtype = libconf.get_dump_type(value)
+    if dtype == 'd':
+        f.write(u'{}{}{{\n'.format(spaces, key_prefix_nl))
+        legacy_dump_dict(value, f, indent + 4)
+        f.write(u'{}}}'.format(spaces))
+    elif dtype == 'l':
+        f.write(u'{}{}(\n'.format(spaces, key_prefix_nl))
+        legacy_dump_collection(value, f, indent + 4)
+        f.write(u'\n{})'.format(spaces))
+    elif dtype == 'a':
+        f.write(u'{}{}[\n'.format(spaces, key_prefix_nl))
+        value_dtype = libconf.get_array_value_dtype(value)
+        if value_dtype == 'i64':
+            value = [libconf.LibconfInt64(v) for v in value]
+        legacy_dump_collection(value, f, indent + 4)
+        f.write(u'\n{}]'.format(spaces))
+    elif dtype == 's':
+        f.write(u'{}{}{}'.format(spaces, key_prefix,
+                                 libconf.dump_string(value)))
+    elif dtype == 'i' or dtype == 'i64':
+        f.write(u'{}{}{}'.format(spaces, key_prefix, libconf.dump_int(value)))
+    else:
+        f.write(u'{}{}{}'.format(spaces, key_prefix, value))
+
+
+def legacy_dump_collection(cfg, f, indent=0):
+    for i, value in enumerate(cfg):
+        legacy_dump_value(None, value, f, indent)
+        if i < len(cfg) - 1:
+            f.write(u',\n')
+
+
+def legacy_dump_dict(cfg, f, indent=0):
+    for key in cfg:
+        legacy_dump_value(key, cfg[key], f, indent)
+        f.write(u';\n')
+
+
+def legacy_dumps(cfg):
+    str_file = io.StringIO()
+    legacy_dump_dict(cfg, str_file, 0)
+    return str_file.getvalue()
+
+
+def main():
+    config = libconf.loads(configgen.generate_config(25000))
+    print("Input: %d groups, %d settings" %
+          (len(config), sum(len(group) for group in config.values())))
+
+    assert legacy_dumps(config) == libconf.dumps(config)
+    print("legacy engine:    %.3f s" %
+          configgen.best_of(lambda: legacy_dumps(config)))
+    print("fragment engine:  %.3f s" %
+          configgen.best_of(lambda: libconf.dumps(config)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+'''Compare load time and memory of the dict_factory choices
+
+Memory is measured with tracemalloc as the size of the loaded result.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import tracemalloc
+
+import configgen
+import libconf
+
+
+def result_size(data, **kwargs):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = libconf.loads(data, **kwargs)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    data = configgen.generate_config(20000)
+    print("Input: %.1f MB" % (len(data) / 1e6,))
+
+    for name, factory in [('AttrDict', libconf.AttrDict),
+                          ('SlimAttrDict', libconf.SlimAttrDict),
+                          ('dict', dict)]:
+        t = configgen.best_of(lambda: libconf.loads(data,
+                                                    dict_factory=factory))
+        size = result_size(data, dict_factory=factory)
+        print("%-14s load %.3f s, result %.1f MB" % (name, t, size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+'''Compare IncrementalConfig.edit() with reloading the whole input'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+
+import configgen
+import libconf
+
+
+def main():
+    data = configgen.generate_config(20000)
+    print("Input: %.1f MB" % (len(data) / 1e6,))
+
+    state = libconf.IncrementalConfig(data)
+    port = data.index(u'port = 11024;')  # In group_10000.
+    comment = data.index(u'# a comment about group 10000')
+    end = len(data)
+
+    edits = [
+        ('change a value', port + 7, 5, u'12345'),
+        ('edit a comment', comment + 2, 1, u'A'),
+        ('insert a setting', end, 0, u'extra = 1;\n'),
+    ]
+    for name, offset, deleted, inserted in edits:
+        original = data[offset:offset + deleted]
+
+        def edit():
+            # Apply the edit and undo it again, so each run starts alike.
+            state.edit(offset, deleted, inserted)
+            state.edit(offset, len(inserted), original)
+
+        full_parses = state.full_parses
+        seconds = configgen.best_of(edit, repeat=20) / 2
+        assert state.full_parses == full_parses
+        print("edit, %-18s %7.2f ms" % (name + ':', seconds * 1e3))
+
+    print("full reload:             %7.2f ms" %
+          (configgen.best_of(lambda: libconf.load(io.StringIO(data))) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
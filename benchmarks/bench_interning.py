@@ -0,0 +1,49 @@
+'''Memory of a list of 100k uniform groups, with and without interning
+
+Memory is measured with tracemalloc as the size of the loaded result.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import tracemalloc
+
+import configgen
+import libconf
+
+
+def servers_config(n):
+    return u'servers = (\n%s\n);\n' % (u',\n'.join(
+        u'    { host = "host-%d"; port = 8080; role = "%s"; '
+        u'datacenter = "dc-%d"; enabled = true; }' %
+        (i, ('web', 'db', 'cache')[i % 3], i % 4)
+        for i in range(n)),)
+
+
+def result_size(data, **kwargs):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = libconf.loads(data, **kwargs)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    data = servers_config(100000)
+    print("Input: %.1f MB, 100000 groups" % (len(data) / 1e6,))
+
+    for name, kwargs in [
+            ('no interning', {}),
+            ('intern_names', {'intern_names': True}),
+            ('+ intern_strings=8', {'intern_names': True,
+                                    'intern_strings': 8}),
+            ('+ SlimAttrDict', {'intern_names': True, 'intern_strings': 8,
+                                'dict_factory': libconf.SlimAttrDict})]:
+        t = configgen.best_of(lambda: libconf.loads(data, **kwargs))
+        print("%-20s load %.3f s, result %.1f MB" %
+              (name, t, result_size(data, **kwargs) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
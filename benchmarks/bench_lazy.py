@@ -0,0 +1,52 @@
+'''Compare eager loading with LazyParser when only a few keys are used
+
+Memory is measured with tracemalloc as the size of the loaded result, after
+the keys have been read.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import tracemalloc
+
+import configgen
+import libconf
+
+
+def result_size(fun):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fun()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    data = configgen.generate_config(20000)
+    print("Input: %.1f MB" % (len(data) / 1e6,))
+
+    def eager():
+        c = libconf.load(io.StringIO(data))
+        return c, (c.group_10.port, c.group_500.hosts, c.group_19999.ids)
+
+    def lazy():
+        c = libconf.load(io.StringIO(data), parser=libconf.LazyParser)
+        return c, (c.group_10.port, c.group_500.hosts, c.group_19999.ids)
+
+    def lazy_full():
+        c = libconf.load(io.StringIO(data), parser=libconf.LazyParser)
+        return libconf.dumps(c)
+
+    assert eager()[1] == lazy()[1]
+    for name, fun in [("eager load, 3 keys:", eager),
+                      ("lazy load, 3 keys:", lazy)]:
+        print("%-22s %.3f s, result %.1f MB" %
+              (name, configgen.best_of(fun), result_size(fun) / 1e6))
+    print("%-22s %.3f s" % ("lazy load, dump all:",
+                            configgen.best_of(lazy_full)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+'''Measure how load_many() scales with the number of worker processes'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import configgen
+import libconf
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(200):
+            path = os.path.join(tmpdir, '%d.cfg' % i)
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(configgen.generate_config(200))
+            paths.append(path)
+        print("Input: %d files, %.1f MB" %
+              (len(paths), sum(os.path.getsize(p) for p in paths) / 1e6))
+
+        ncpus = multiprocessing.cpu_count()
+        serial = configgen.best_of(lambda: libconf.load_many(paths,
+                                                             workers=1))
+        print("serial:         %.3f s" % serial)
+        for workers in range(2, max(ncpus, 2) + 1):
+            t = configgen.best_of(lambda: libconf.load_many(paths,
+                                                            workers=workers))
+            print("%2d processes:   %.3f s (%.1fx)" %
+                  (workers, t, serial / t))
+        t = configgen.best_of(lambda: libconf.load_many(paths, workers=ncpus,
+                                                        threads=True))
+        print("%2d threads:     %.3f s (%.1fx)" % (ncpus, t, serial / t))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
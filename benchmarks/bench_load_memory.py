@@ -0,0 +1,95 @@
+'''Compare time and peak RSS of load() variants on a large input file
+
+Each variant runs in its own subprocess, so that ``ru_maxrss`` reports the
+peak of that variant alone. The parse result is discarded immediately, so
+the numbers are dominated by what is alive while parsing. Usage:
+``bench_load_memory.py [size_in_MB]``
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import configgen
+import libconf
+
+
+def load_lines(f):
+    '''Load by joining all lines, as read_tokens() did before chunking
+
+    Every line is checked for include directives with a regex call; this
+    benchmark input doesn't contain any.
+    '''
+    lines = []
+    for line in f:
+        if re.match(r'@include "(.*)"$', line.strip()):
+            raise ValueError("includes are not supported here")
+        lines.append(line)
+
+    tokens = libconf.Tokenizer(f.name).scan(''.join(lines))
+    return libconf.Parser(libconf.TokenStream(tokens)).parse()
+
+
+def load_materialized(f):
+    '''Load with a fully materialized token list, like before streaming'''
+    tokens = list(libconf.TokenStream.read_tokens(f))
+    return libconf.Parser(libconf.TokenStream(tokens)).parse()
+
+
+def iterparse(f):
+    '''Consume all iterparse() events without building anything'''
+    for event in libconf.iterparse(f):
+        pass
+
+
+VARIANTS = {
+    'materialized': load_materialized,
+    'iterparse': iterparse,
+    'lines': load_lines,
+    'chunked': libconf.load,
+}
+
+
+def measure(path, variant):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t_start = time.time()
+    with io.open(path, 'r', encoding='utf-8') as f:
+        VARIANTS[variant](f)
+    t_end = time.time()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("%-13s %6.2f s, peak RSS +%.1f MB" %
+          (variant, t_end - t_start, (rss_after - rss_before) / 1024))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+        return
+
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    data = configgen.generate_config(int(size_mb * 1e6 / 310))
+    fd, path = tempfile.mkstemp(suffix='.cfg')
+    try:
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        del data
+        with io.open(path, 'r', encoding='utf-8') as f:
+            n_lines = sum(1 for line in f)
+        print("Input: %.1f MB, %d lines" %
+              (os.path.getsize(path) / 1e6, n_lines))
+        for variant in sorted(VARIANTS):
+            subprocess.check_call([sys.executable, __file__, '--measure',
+                                   path, variant])
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
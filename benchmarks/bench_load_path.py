@@ -0,0 +1,38 @@
+'''Compare load() on a text file with load_path() on a memory-mapped file'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import tempfile
+
+import configgen
+import libconf
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'input.cfg')
+        data = configgen.generate_config(20000)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        print("Input: %.1f MB" % (len(data) / 1e6,))
+
+        def text():
+            with io.open(path, 'r', encoding='utf-8') as f:
+                return libconf.load(f)
+
+        def mapped():
+            return libconf.load_path(path)
+
+        assert text() == mapped()
+        print("load(), text file:    %.3f s" % configgen.best_of(text))
+        print("load_path(), mmap:    %.3f s" % configgen.best_of(mapped))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
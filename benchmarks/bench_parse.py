@@ -0,0 +1,57 @@
+'''Parse-only benchmark of scalar-heavy input
+
+Tokens are produced once up front, so only ``Parser`` work is timed. The
+``AnyOfParser`` reproduces the former try-every-production dispatch,
+``IterativeParser`` is the explicit-stack engine.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import configgen
+import libconf
+
+
+class AnyOfParser(libconf.Parser):
+    def value(self):
+        return self._parse_any_of([self.scalar_value, self.array, self.list,
+                                   self.group])
+
+    def scalar_value(self):
+        return self._parse_any_of([self.string, self.boolean, self.integer,
+                                   self.float, self.hex, self.integer64,
+                                   self.hex64])
+
+    def _parse_any_of(self, nonterminals):
+        for fun in nonterminals:
+            result = fun()
+            if result is not None:
+                return result
+        return None
+
+
+def scalar_config(n):
+    values = [u'"s%d"', u'%d', u'%d.5', u'0x%X', u'%dL', u'0x%XL', u'true']
+    return u''.join(u'v%d = [%s];\n' % (i, u', '.join(
+        v % (i,) if u'%' in v else v for v in values * 4))
+        for i in range(n))
+
+
+def nested_config(n, depth):
+    value = u'{ a = ' * depth + u'(1, 2.0, "s")' + u'; }' * depth
+    return u''.join(u'v%d = %s;\n' % (i, value) for i in range(n))
+
+
+def main():
+    for title, data in [('scalar-heavy', scalar_config(20000)),
+                        ('mixed', configgen.generate_config(20000)),
+                        ('nested', nested_config(500, 100))]:
+        tokens = list(libconf.Tokenizer('<bench>').scan(data))
+        print("%s input: %d tokens" % (title, len(tokens)))
+        for cls in (AnyOfParser, libconf.Parser, libconf.IterativeParser):
+            t = configgen.best_of(
+                lambda: cls(libconf.TokenStream(tokens)).parse())
+            print("    %-16s %.3f s" % (cls.__name__, t))
+
+
+if __name__ == '__main__':
+    main()
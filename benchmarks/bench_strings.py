@@ -0,0 +1,71 @@
+'''Micro-benchmarks for string decoding and dumping
+
+``legacy_decode_escapes`` and ``legacy_dump_string`` reproduce the former
+implementations without fast paths.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import codecs
+
+import configgen
+import libconf
+
+
+def legacy_decode_escapes(s):
+    def decode_match(match):
+        return codecs.decode(match.group(0), 'unicode-escape')
+
+    return libconf.ESCAPE_SEQUENCE_RE.sub(decode_match, s)
+
+
+def legacy_dump_string(s):
+    s = (s.replace('\\', '\\\\')
+          .replace('"', '\\"')
+          .replace('\f', r'\f')
+          .replace('\n', r'\n')
+          .replace('\r', r'\r')
+          .replace('\t', r'\t'))
+    s = libconf.UNPRINTABLE_CHARACTER_RE.sub(
+            lambda m: r'\x{:02x}'.format(ord(m.group(0))),
+            s)
+    return '"' + s + '"'
+
+
+def string_config(n):
+    return u''.join(
+        u's%d = ["plain value %d", "host-%d.example.com", "%s"];\n' %
+        (i, i, i, u'tab\\tand \\"quotes\\"' if i % 100 == 0 else u'x')
+        for i in range(n))
+
+
+def main():
+    plain = [u'plain value %d' % i for i in range(100000)]
+    escaped = [u'line %d\\n\\t\\"quoted\\"' % i for i in range(100000)]
+    decoded = [legacy_decode_escapes(s) for s in escaped]
+    assert [libconf.decode_escapes(s) for s in escaped] == decoded
+    assert ([libconf.dump_string(s) for s in plain + decoded] ==
+            [legacy_dump_string(s) for s in plain + decoded])
+
+    def timed(fun, strings):
+        return configgen.best_of(lambda: [fun(s) for s in strings])
+
+    for name, strings in [('plain', plain), ('escaped', escaped)]:
+        print("decode_escapes, 100k %-8s legacy %.3f s, new %.3f s" %
+              (name + ':', timed(legacy_decode_escapes, strings),
+               timed(libconf.decode_escapes, strings)))
+    for name, strings in [('plain', plain), ('escaped', decoded)]:
+        print("dump_string, 100k %-8s    legacy %.3f s, new %.3f s" %
+              (name + ':', timed(legacy_dump_string, strings),
+               timed(libconf.dump_string, strings)))
+
+    data = string_config(30000)
+    config = libconf.loads(data)
+    print("loads, string-heavy config: %.3f s" %
+          configgen.best_of(lambda: libconf.loads(data)))
+    print("dumps, string-heavy config: %.3f s" %
+          configgen.best_of(lambda: libconf.dumps(config)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+'''Compare peak RSS of token representations
+
+``dict`` mimics the former Token classes, which had an instance ``__dict__``
+holding filename, row, column and the converted value. ``objects`` are the
+current ``__slots__`` Token classes, ``compact`` the tuples used by
+TokenStream and Parser.
+
+Each variant runs in its own subprocess, so that ``ru_maxrss`` reports the
+peak of that variant alone. Usage: ``bench_token_memory.py [size_in_MB]``
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import configgen
+import libconf
+
+
+class DictToken(object):
+    '''Stand-in for the former Token classes with an instance __dict__'''
+    def __init__(self, type, text, filename, row, column, value):
+        self.type = type
+        self.text = text
+        self.filename = filename
+        self.row = row
+        self.column = column
+        self.value = value
+
+
+def measure(path, variant):
+    with io.open(path, 'r', encoding='utf-8') as f:
+        data = f.read()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tokenizer = libconf.Tokenizer(path)
+    if variant == 'dict':
+        tokens = [DictToken(t.type, t.text, path, t.offset, 1,
+                            getattr(t, 'value', None))
+                  for t in tokenizer.tokenize(data)]
+    elif variant == 'objects':
+        tokens = list(tokenizer.tokenize(data))
+    else:
+        tokens = list(tokenizer.scan(data))
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("%-8s %9d tokens, peak RSS +%.1f MB" %
+          (variant, len(tokens), (rss_after - rss_before) / 1024))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+        return
+
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    data = configgen.generate_config(int(size_mb * 1e6 / 310))
+    fd, path = tempfile.mkstemp(suffix='.cfg')
+    try:
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        del data
+        print("Input: %.1f MB" % (os.path.getsize(path) / 1e6,))
+        for variant in ('dict', 'objects', 'compact'):
+            subprocess.check_call([sys.executable, __file__, '--measure',
+                                   path, variant])
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
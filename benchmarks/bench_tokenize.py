@@ -0,0 +1,44 @@
+'''Compare the master-regex tokenizer with the former per-pattern loop'''
+
+from __future__ import absolute_import, division, print_function
+
+import configgen
+import libconf
+
+
+def legacy_tokenize(tokenizer, string):
+    '''The pre-master-regex Tokenizer.tokenize() loop, kept for comparison'''
+
+    pos = 0
+    while pos < len(string):
+        m = libconf.SKIP_RE.match(string, pos=pos)
+        if m:
+            pos = m.end()
+            continue
+
+        for cls, type, regex in tokenizer.token_map:
+            m = regex.match(string, pos=pos)
+            if m:
+                yield cls(type, m.group(0), pos, tokenizer.lines)
+                pos = m.end()
+                break
+        else:
+            raise libconf.ConfigParseError("invalid input at %d" % pos)
+
+
+def main():
+    data = configgen.generate_config(20000)
+    print("Input: %.1f MB" % (len(data) / 1e6,))
+
+    t_legacy = configgen.best_of(lambda: list(
+        legacy_tokenize(libconf.Tokenizer('<bench>'), data)))
+    t_master = configgen.best_of(lambda: list(
+        libconf.Tokenizer('<bench>').tokenize(data)))
+
+    print("per-pattern loop: %.3f s" % (t_legacy,))
+    print("master regex:     %.3f s" % (t_master,))
+    print("speedup:          %.2fx" % (t_legacy / t_master,))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''Load and dump large numeric arrays with and without typed_arrays
+
+Memory is the size of the arrays' contents as reported by sys.getsizeof(),
+including the element objects for lists.
+'''
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+import configgen
+import libconf
+
+
+def table_config(n_tables, n_values):
+    return u''.join(
+        u'int_table_%d = [%s];\nfloat_table_%d = [%s];\n' % (
+            i, u', '.join(u'%d' % (i * j) for j in range(n_values)),
+            i, u', '.join(u'%d.5' % (i + j) for j in range(n_values)))
+        for i in range(n_tables))
+
+
+def array_bytes(value):
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def main():
+    data = table_config(20, 50000)
+    print("Input: %.1f MB" % (len(data) / 1e6,))
+
+    untyped = libconf.loads(data)
+    typed = libconf.loads(data, typed_arrays=True)
+    assert libconf.dumps(untyped) == libconf.dumps(typed)
+
+    print("load, lists:         %.3f s" %
+          configgen.best_of(lambda: libconf.loads(data)))
+    print("load, typed arrays:  %.3f s" %
+          configgen.best_of(lambda: libconf.loads(data, typed_arrays=True)))
+    print("dump, lists:         %.3f s" %
+          configgen.best_of(lambda: libconf.dumps(untyped)))
+    print("dump, typed arrays:  %.3f s" %
+          configgen.best_of(lambda: libconf.dumps(typed)))
+
+    n = sum(len(v) for v in untyped.values())
+    print("memory, lists:        %.1f bytes/element" %
+          (sum(array_bytes(v) for v in untyped.values()) / n))
+    print("memory, typed arrays: %.1f bytes/element" %
+          (sum(array_bytes(v) for v in typed.values()) / n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''Measure the cost of ConfigWatcher polls and reloads'''
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import tempfile
+
+import configgen
+import libconf
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'main.cfg')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            for i in range(100):
+                f.write(u'@include "include_%d.cfg"\n' % (i,))
+        for i in range(100):
+            with io.open(os.path.join(tmpdir, 'include_%d.cfg' % (i,)), 'w',
+                         encoding='utf-8') as f:
+                f.write(configgen.generate_config(200).replace(
+                    u'group_', u'group_%d_' % (i,)))
+        print("Input: 101 files, %.1f MB" %
+              (sum(os.path.getsize(os.path.join(tmpdir, name))
+                   for name in os.listdir(tmpdir)) / 1e6,))
+
+        changes = []
+        watcher = libconf.ConfigWatcher(
+            path, lambda c, config: changes.append(c), includedir=tmpdir,
+            debounce=0)
+        print("poll, nothing changed:  %.2f ms" %
+              (configgen.best_of(watcher.check, repeat=20) * 1e3,))
+
+        include = os.path.join(tmpdir, 'include_50.cfg')
+        with io.open(include, 'r', encoding='utf-8') as f:
+            data = f.read()
+        edits = [data.replace(u'port = 1124;', u'port = 1125;'), data]
+
+        def reload():
+            with io.open(include, 'w', encoding='utf-8') as f:
+                f.write(edits[len(changes) % 2])
+            assert watcher.check()
+
+        print("reload and diff:        %.3f s" % configgen.best_of(reload))
+        assert [change[:2] for change in changes[-1]] == [
+            ('changed', ('group_50_100', 'port'))]
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
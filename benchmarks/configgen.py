@@ -0,0 +1,36 @@
+'''Generate synthetic libconfig input for the benchmark scripts'''
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def generate_config(n_groups):
+    '''Return a libconfig string with ``n_groups`` mixed-type groups'''
+
+    parts = []
+    for i in range(n_groups):
+        parts.append(
+            u'group_%d = {\n'
+            u'    # a comment about group %d\n'
+            u'    name = "service-%d";\n'
+            u'    enabled = true;\n'
+            u'    port = %d;\n'
+            u'    mask = 0x%XL;\n'
+            u'    ratio = %d.25e-3;\n'
+            u'    /* a block comment\n'
+            u'       spanning two lines */\n'
+            u'    hosts = ("host-a", "host-b", { weight = %d; });\n'
+            u'    ids = [%d, %d, %d, %d];\n'
+            u'};\n' % (i, i, i, 1024 + i, i, i, i, i, i + 1, i + 2, i + 3))
+    return u''.join(parts)
+
+
+def best_of(fun, repeat=3):
+    '''Return the fastest wall-clock time of ``repeat`` calls to ``fun``'''
+
+    import timeit
+    return min(timeit.repeat(fun, number=1, repeat=repeat))
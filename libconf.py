@@ -4,10 +4,24 @@ from __future__ import absolute_import, division, print_function
 
 import sys
 import os
+import array
+import bisect
 import codecs
 import collections
+import copy
+import hashlib
 import io
+import mmap
+import pickle
 import re
+import tempfile
+import threading
+import traceback
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 
 # Define an isstr() and isint() that work on both Python2 and Python3.
 # See http://stackoverflow.com/questions/11301138
@@ -31,6 +45,15 @@ except NameError:
 
     LONGTYPE = int
 
+# Python 2 can only intern byte strings, use an explicit table there.
+try:
+    intern_string = sys.intern
+except AttributeError:
+    INTERNED_STRINGS = {}
+
+    def intern_string(s):
+        return INTERNED_STRINGS.setdefault(s, s)
+
 # Bounds to determine when an "L" suffix should be used during dump().
 SMALL_INT_MIN = -2**31
 SMALL_INT_MAX = 2**31 - 1
@@ -42,15 +65,35 @@ ESCAPE_SEQUENCE_RE = re.compile(r'''
 
 SKIP_RE = re.compile(r'\s+|#.*$|//.*$|/\*(.|\n)*?\*/', re.MULTILINE)
 UNPRINTABLE_CHARACTER_RE = re.compile(r'[\x00-\x1F\x7F]')
+DUMP_ESCAPE_RE = re.compile(r'[\x00-\x1F\x7F\\"]')
+NEWLINE_RE = re.compile(r'\n')
+INCLUDE_RE = re.compile(r'^[^\S\n]*@include "(.*)"[^\S\n]*$', re.MULTILINE)
+NEWLINE_BYTES_RE = re.compile(NEWLINE_RE.pattern.encode('ascii'))
+NON_ASCII_BYTES_RE = re.compile(b'[\x80-\xff]')
+INCLUDE_BYTES_RE = re.compile(INCLUDE_RE.pattern.encode('ascii'),
+                              re.MULTILINE)
 
 
 # load() logic
 ##############
 
+# Decoded values of the single-character escape sequences.
+SINGLE_CHARACTER_ESCAPES = dict(
+    (escape, codecs.decode(escape, 'unicode-escape'))
+    for escape in ('\\\\', "\\'", '\\"', '\\a', '\\b', '\\f', '\\n',
+                   '\\r', '\\t', '\\v'))
+
+
 def decode_escapes(s):
     '''Unescape libconfig string literals'''
+    if '\\' not in s:
+        return s  # Nothing to unescape, the common case.
+
     def decode_match(match):
-        return codecs.decode(match.group(0), 'unicode-escape')
+        escape = match.group(0)
+        if escape in SINGLE_CHARACTER_ESCAPES:
+            return SINGLE_CHARACTER_ESCAPES[escape]
+        return codecs.decode(escape, 'unicode-escape')
 
     return ESCAPE_SEQUENCE_RE.sub(decode_match, s)
 
@@ -71,6 +114,99 @@ class AttrDict(collections.OrderedDict):
             raise AttributeError("Attribute %r not found" % attr)
 
 
+class SlimAttrDict(dict):
+    '''dict subclass giving access to string keys via attribute access
+
+    A lighter alternative to AttrDict for use as ``dict_factory``: it has no
+    per-instance ``__dict__`` and relies on the insertion order of ``dict``
+    (Python 3.7+) instead of an OrderedDict.
+    '''
+    __slots__ = ()
+
+    def __getattr__(self, attr):
+        # Take care that getattr() raises AttributeError, not KeyError.
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError("Attribute %r not found" % attr)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, dict.__repr__(self))
+
+
+class LazyAttrDict(AttrDict):
+    '''AttrDict whose group values are parsed when they are first accessed
+
+    Produced by ``LazyParser``. Until then, group values are stored as
+    ``LazyGroup`` objects, so loading only pays for the parts of the input
+    that are actually used. Syntax errors within a group are only detected
+    when it is parsed.
+
+    Otherwise, instances behave like the ``AttrDict`` returned by a regular
+    ``load()``, including iteration order, comparisons and ``dump()``.
+    '''
+
+    def __getitem__(self, key):
+        value = AttrDict.__getitem__(self, key)
+        if isinstance(value, LazyGroup):
+            value = value.parse()
+            AttrDict.__setitem__(self, key, value)
+        return value
+
+    def resolve(self):
+        '''Parse all values of this dict that haven't been parsed yet'''
+        for key in list(self.keys()):
+            self[key]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *args):
+        if key in self:
+            self[key]
+        return AttrDict.pop(self, key, *args)
+
+    def popitem(self, *args, **kwargs):
+        self.resolve()
+        return AttrDict.popitem(self, *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return AttrDict.setdefault(self, key, default)
+
+    def values(self):
+        self.resolve()
+        return AttrDict.values(self)
+
+    def items(self):
+        self.resolve()
+        return AttrDict.items(self)
+
+    def copy(self):
+        self.resolve()
+        return AttrDict.copy(self)
+
+    def __eq__(self, other):
+        self.resolve()
+        if isinstance(other, LazyAttrDict):
+            other.resolve()
+        return AttrDict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self.resolve()
+        return AttrDict.__repr__(self)
+
+    def __reduce__(self):
+        self.resolve()
+        return AttrDict.__reduce__(self)
+
+
 class ConfigParseError(RuntimeError):
     '''Exception class raised on errors reading the libconfig input'''
     pass
@@ -81,14 +217,80 @@ class ConfigSerializeError(TypeError):
     pass
 
 
+class LineIndex(object):
+    '''Map character offsets within one input file to rows and columns
+
+    The start offset of every line is recorded as the input is tokenized.
+    Offsets are only converted to ``(row, column)`` when a location is
+    actually needed, which is usually just for error messages.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.line_starts = array.array('l', [0])
+        self.length = 0
+
+    def add(self, string):
+        '''Record the line starts of ``string``, which follows earlier input'''
+        base = self.length
+        self.line_starts.extend(m.end() + base
+                                for m in NEWLINE_RE.finditer(string))
+        self.length += len(string)
+
+    def location(self, offset):
+        '''Return the 1-based ``(row, column)`` of ``offset``'''
+        row = bisect.bisect_right(self.line_starts, offset)
+        return row, offset - self.line_starts[row - 1] + 1
+
+
+class BytesLineIndex(LineIndex):
+    '''LineIndex for UTF-8 encoded input, where offsets count bytes
+
+    ``data`` is kept to convert byte offsets into character columns.
+    '''
+
+    def __init__(self, filename, data):
+        super(BytesLineIndex, self).__init__(filename)
+        self.data = data
+        self.line_starts.extend(m.end()
+                                for m in NEWLINE_BYTES_RE.finditer(data))
+        self.length = len(data)
+
+    def location(self, offset):
+        row = bisect.bisect_right(self.line_starts, offset)
+        line = self.data[self.line_starts[row - 1]:offset]
+        return row, len(line.decode('utf-8', 'replace')) + 1
+
+
 class Token(object):
-    '''Base class for all tokens produced by the libconf tokenizer'''
-    def __init__(self, type, text, filename, row, column):
+    '''Base class for all tokens produced by the libconf tokenizer
+
+    Tokens only store their character offset; ``row`` and ``column`` are
+    looked up in the ``LineIndex`` of their input file on demand.
+
+    ``TokenStream`` and ``Parser`` don't use these classes, but the compact
+    ``(type, text, offset, lines)`` tuples produced by ``Tokenizer.scan()``.
+    The ``convert()`` methods turn the token text into its Python value.
+    '''
+    __slots__ = ('type', 'text', 'offset', 'lines')
+
+    def __init__(self, type, text, offset, lines):
         self.type = type
         self.text = text
-        self.filename = filename
-        self.row = row
-        self.column = column
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def filename(self):
+        return self.lines.filename
+
+    @property
+    def row(self):
+        return self.lines.location(self.offset)[0]
+
+    @property
+    def column(self):
+        return self.lines.location(self.offset)[1]
 
     def __str__(self):
         return "%r in %r, row %d, column %d" % (
@@ -97,34 +299,67 @@ class Token(object):
 
 class FltToken(Token):
     '''Token subclass for floating point values'''
+    __slots__ = ('value',)
+
     def __init__(self, *args, **kwargs):
         super(FltToken, self).__init__(*args, **kwargs)
-        self.value = float(self.text)
+        self.value = self.convert(self.text)
+
+    convert = staticmethod(float)
 
 
 class IntToken(Token):
     '''Token subclass for integral values'''
+    __slots__ = ('value', 'is_long', 'is_hex')
+
     def __init__(self, *args, **kwargs):
         super(IntToken, self).__init__(*args, **kwargs)
         self.is_long = self.text.endswith('L')
         self.is_hex = (self.text[1:2].lower() == 'x')
-        self.value = int(self.text.rstrip('L'), 0)
-        if self.is_long:
-            self.value = LibconfInt64(self.value)
+        self.value = self.convert(self.text)
+
+    @staticmethod
+    def convert(text):
+        # BytesTokenizer passes 'integer' and 'hex' tokens as bytes, whose
+        # last item is an int and never equal to 'L'.
+        if text[-1] == 'L':
+            return LibconfInt64(int(text.rstrip('L'), 0))
+        return int(text, 0)
 
 
 class BoolToken(Token):
     '''Token subclass for booleans'''
+    __slots__ = ('value',)
+
     def __init__(self, *args, **kwargs):
         super(BoolToken, self).__init__(*args, **kwargs)
-        self.value = (self.text[0].lower() == 't')
+        self.value = self.convert(self.text)
+
+    @staticmethod
+    def convert(text):
+        return text[0].lower() == 't'
 
 
 class StrToken(Token):
     '''Token subclass for strings'''
+    __slots__ = ('value',)
+
     def __init__(self, *args, **kwargs):
         super(StrToken, self).__init__(*args, **kwargs)
-        self.value = decode_escapes(self.text[1:-1])
+        self.value = self.convert(self.text)
+
+    @staticmethod
+    def convert(text):
+        return decode_escapes(text[1:-1])
+
+
+def format_token(token):
+    '''Describe a compact token tuple the way ``str(Token)`` does'''
+    type, text, offset, lines = token
+    if not isstr(text):
+        text = text.decode('utf-8')  # From BytesTokenizer
+    row, column = lines.location(offset)
+    return "%r in %r, row %d, column %d" % (text, lines.filename, row, column)
 
 
 def compile_regexes(token_map):
@@ -132,6 +367,27 @@ def compile_regexes(token_map):
             for cls, type, regex in token_map]
 
 
+def compile_master_regex(token_map):
+    '''Combine SKIP_RE and all ``token_map`` regexes into one alternation
+
+    Every pattern becomes a named group, in ``token_map`` order, so the regex
+    engine tries them with the same priority as matching them one by one. A
+    final ``error`` group matches any single character no other group does.
+
+    Returns the compiled regex and a dict mapping group names to token types.
+    '''
+
+    groups = {}
+    alternatives = ['(?P<skip>%s)' % (SKIP_RE.pattern,)]
+    for i, (cls, type, regex) in enumerate(token_map):
+        name = 't%d' % (i,)
+        groups[name] = type
+        alternatives.append('(?P<%s>%s)' % (name, regex.pattern))
+    alternatives.append('(?P<error>.)')
+
+    return re.compile('|'.join(alternatives), SKIP_RE.flags), groups
+
+
 class Tokenizer:
     '''Tokenize an input string
 
@@ -155,7 +411,8 @@ class Tokenizer:
         (IntToken,  'hex',       r'0[Xx][0-9A-Fa-f]+'),
         (IntToken,  'integer64', r'[-+]?[0-9]+L(L)?'),
         (IntToken,  'integer',   r'[-+]?[0-9]+'),
-        (BoolToken, 'boolean',   r'(?i)(true|false)\b'),
+        (BoolToken, 'boolean',   r'([Tt][Rr][Uu][Ee]|'
+                                 r'[Ff][Aa][Ll][Ss][Ee])\b'),
         (StrToken,  'string',    r'"([^"\\]|\\.)*"'),
         (Token,     'name',      r'[A-Za-z\*][-A-Za-z0-9_\*]*'),
         (Token,     '}',         r'\}'),
@@ -170,40 +427,124 @@ class Tokenizer:
         (Token,     ':',         r':'),
     ])
 
+    master_regex, master_groups = compile_master_regex(token_map)
+    token_classes = dict((type, cls) for cls, type, regex in token_map)
+
+    # Tokens ending closer than this to the end of non-final input might
+    # continue in the next chunk (e.g. "12" + "e3"), so they are deferred.
+    chunk_margin = 16
+
     def __init__(self, filename):
         self.filename = filename
-        self.row = 1
-        self.column = 1
+        self.lines = LineIndex(filename)
+        self.pending = ''
 
     def tokenize(self, string):
-        '''Yield tokens from the input string or throw ConfigParseError'''
-        pos = 0
-        while pos < len(string):
-            m = SKIP_RE.match(string, pos=pos)
-            if m:
-                skip_lines = m.group(0).split('\n')
-                if len(skip_lines) > 1:
-                    self.row += len(skip_lines) - 1
-                    self.column = 1 + len(skip_lines[-1])
-                else:
-                    self.column += len(skip_lines[0])
+        '''Yield tokens from the input string or throw ConfigParseError
 
-                pos = m.end()
+        Successive calls continue the input of earlier calls, i.e. token
+        offsets and locations count from the start of the first string.
+        '''
+        classes = self.token_classes
+        for token in self.scan(string):
+            yield classes[token[0]](*token)
+
+    def scan(self, string, final=True):
+        '''Like ``tokenize()``, but yield compact token tuples
+
+        The tuples have the form ``(type, text, offset, lines)``, where
+        ``lines`` is the ``LineIndex`` of the input file.
+
+        If ``final`` is false, more input is going to follow in another call.
+        Scanning then stops before tokens close to the end of ``string`` and
+        before incomplete strings or comments; the unscanned rest is kept in
+        ``self.pending`` and processed together with the next input.
+        '''
+        lines = self.lines
+        pending = self.pending
+        base = lines.length - len(pending)
+        lines.add(string)
+        if pending:
+            string = pending + string
+            self.pending = ''
+
+        limit = len(string) if final else len(string) - self.chunk_margin
+        groups = self.master_groups
+        for m in self.master_regex.finditer(string):
+            kind = m.lastgroup
+            if m.end() > limit:
+                self.pending = string[m.start():]
+                return
+
+            if kind == 'skip':
                 continue
 
-            for cls, type, regex in self.token_map:
-                m = regex.match(string, pos=pos)
-                if m:
-                    yield cls(type, m.group(0),
-                              self.filename, self.row, self.column)
-                    self.column += len(m.group(0))
-                    pos = m.end()
-                    break
+            if kind == 'error':
+                pos = m.start()
+                if not final and string[pos] in '"/':
+                    # Possibly a string or comment continuing in the next
+                    # chunk; SKIP_RE and the string regex can't match yet.
+                    self.pending = string[pos:]
+                    return
+
+                row, column = lines.location(base + pos)
+                raise ConfigParseError(
+                    "Couldn't load config in %r row %d, column %d: %r" %
+                    (self.filename, row, column, string[pos:pos+20]))
+
+            yield (groups[kind], m.group(0), base + m.start(), lines)
+
+
+class BytesTokenizer(Tokenizer):
+    '''Tokenize UTF-8 encoded input without decoding all of it
+
+    ``data`` may be any buffer the ``re`` module accepts, e.g. ``bytes`` or
+    an ``mmap``. Only the text of string, name and boolean tokens (and of
+    64-bit integers) is decoded; other numbers are passed on as bytes, which
+    ``int()`` and ``float()`` accept directly. Punctuation tokens reuse their
+    type as text. Token offsets count bytes.
+    '''
+
+    master_regex = re.compile(Tokenizer.master_regex.pattern.encode('ascii'),
+                              Tokenizer.master_regex.flags & ~re.UNICODE)
+    raw_groups = frozenset(name
+                           for name, type in Tokenizer.master_groups.items()
+                           if type in ('float', 'hex', 'integer'))
+    fixed_texts = dict((name, type)
+                       for name, type in Tokenizer.master_groups.items()
+                       if len(type) == 1)
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.lines = BytesLineIndex(filename, data)
+        self.data = data
+
+    def scan(self):
+        '''Yield compact token tuples for all of ``data``'''
+        data = self.data
+        lines = self.lines
+        groups = self.master_groups
+        raw_groups = self.raw_groups
+        fixed_texts = self.fixed_texts
+        for m in self.master_regex.finditer(data):
+            kind = m.lastgroup
+            if kind == 'skip':
+                continue
+
+            if kind in fixed_texts:
+                yield (groups[kind], fixed_texts[kind], m.start(), lines)
+            elif kind in raw_groups:
+                yield (groups[kind], m.group(0), m.start(), lines)
+            elif kind != 'error':
+                yield (groups[kind], m.group(0).decode('utf-8'), m.start(),
+                       lines)
             else:
+                pos = m.start()
+                row, column = lines.location(pos)
                 raise ConfigParseError(
                     "Couldn't load config in %r row %d, column %d: %r" %
-                    (self.filename, self.row, self.column,
-                     string[pos:pos+20]))
+                    (self.filename, row, column,
+                     data[pos:pos+20].decode('utf-8', 'replace')))
 
 
 class TokenStream:
@@ -214,74 +555,187 @@ class TokenStream:
 
     The ``from_file()`` method is the preferred way to read input files, as
     it handles include directives, which the ``Tokenizer`` class does not do.
+
+    Tokens are pulled from the underlying iterable one at a time, only a
+    single token of lookahead is kept in memory.
     '''
 
+    # Number of characters read from input files at once.
+    chunk_size = 65536
+
     def __init__(self, tokens):
         self.position = 0
-        self.tokens = list(tokens)
+        self.tokens = iter(tokens)
+        self.next_token = next(self.tokens, None)
 
     @classmethod
-    def from_file(cls, f, filename=None, includedir='', seenfiles=None):
+    def from_file(cls, f, filename=None, includedir='', seenfiles=None,
+                  includefiles=None, include_cache=None):
         '''Create a token stream by reading an input file
 
         Read tokens from `f`. If an include directive ('@include "file.cfg"')
         is found, read its contents as well.
 
+        Tokens are read lazily as the stream is consumed, so `f` must stay
+        open until parsing is done. See ``read_tokens()`` for the arguments.
+        '''
+
+        return cls(cls.read_tokens(f, filename=filename,
+                                   includedir=includedir,
+                                   seenfiles=seenfiles,
+                                   includefiles=includefiles,
+                                   include_cache=include_cache))
+
+    @classmethod
+    def read_tokens(cls, f, filename=None, includedir='', seenfiles=None,
+                    includefiles=None, include_cache=None):
+        '''Generate compact tokens from an input file, following includes
+
         The `filename` argument is used for error messages and to detect
         circular imports. ``includedir`` sets the lookup directory for included
         files.  ``seenfiles`` is used internally to detect circular includes,
         and should normally not be supplied by users of is function.
+
+        If ``includefiles`` is a list, the names of all files included
+        (directly or indirectly) are appended to it as they are opened.
+
+        Included files are tokenized through ``include_cache``, so each of
+        them is read only once, no matter how often it is included. If no
+        ``IncludeCache`` is given, a new one is used for this call, which
+        streams the first include of each file and keeps token lists only
+        for files included again.
         '''
 
         if filename is None:
             filename = getattr(f, 'name', '<unknown>')
         if seenfiles is None:
             seenfiles = set()
+        if include_cache is None:
+            include_cache = IncludeCache(check_files=False, stream_first=True)
 
         if filename in seenfiles:
             raise ConfigParseError("Circular include: %r" % (filename,))
         seenfiles = seenfiles | {filename}  # Copy seenfiles, don't alter it.
 
         tokenizer = Tokenizer(filename=filename)
-        lines = []
-        tokens = []
-        for line in f:
-            m = re.match(r'@include "(.*)"$', line.strip())
-            if m:
-                tokens.extend(tokenizer.tokenize(''.join(lines)))
-                lines = [re.sub(r'\S', ' ', line)]
-
-                includefilename = decode_escapes(m.group(1))
-                includefilename = os.path.join(includedir, includefilename)
-                try:
-                    includefile = open(includefilename, "r")
-                except IOError:
-                    raise ConfigParseError("Could not open include file %r" %
-                                           (includefilename,))
-
-                with includefile:
-                    includestream = cls.from_file(includefile,
-                                                  filename=includefilename,
-                                                  includedir=includedir,
-                                                  seenfiles=seenfiles)
-                tokens.extend(includestream.tokens)
-
+        rest = ''  # Incomplete last line, not yet checked for includes.
+        at_line_start = True
+        while True:
+            chunk = f.read(max(cls.chunk_size, len(tokenizer.pending)))
+            final = not chunk
+            data = rest + chunk
+            if final:
+                rest = ''
             else:
-                lines.append(line)
+                cut = data.rfind('\n') + 1
+                data, rest = data[:cut], data[cut:]
+                if len(rest) > cls.chunk_size:
+                    start = rest.lstrip()[:8]
+                    if start and start != '@include'[:len(start)]:
+                        # A long line that can't be an include directive.
+                        data, rest = data + rest, ''
+
+            pos = 0
+            if '@include' in data:
+                for m in INCLUDE_RE.finditer(data):
+                    if m.start() == 0 and not at_line_start:
+                        continue
+
+                    # Blank out the directive, keeping offsets unchanged.
+                    text = data[pos:m.start()] + ' ' * (m.end() - m.start())
+                    pos = m.end()
+                    for token in tokenizer.scan(text):
+                        yield token
+
+                    includefilename = decode_escapes(m.group(1))
+                    includefilename = os.path.join(includedir,
+                                                   includefilename)
+                    for token in include_cache.tokens(
+                            cls, includefilename, includedir=includedir,
+                            seenfiles=seenfiles, includefiles=includefiles):
+                        yield token
+
+            if data or final:
+                for token in tokenizer.scan(data[pos:], final=final):
+                    yield token
+                at_line_start = data.endswith('\n')
+            if final:
+                return
+
+    @classmethod
+    def read_bytes_tokens(cls, data, filename=None, includedir='',
+                          seenfiles=None, includefiles=None,
+                          include_cache=None):
+        '''Generate compact tokens from UTF-8 encoded ``data``
+
+        Works like ``read_tokens()``, but tokenizes with ``BytesTokenizer``.
+        ``data`` is copied only if it contains include directives, which are
+        blanked out in the copy. Included files are read as text.
+        '''
+
+        if filename is None:
+            filename = '<unknown>'
+        if seenfiles is None:
+            seenfiles = set()
+        if include_cache is None:
+            include_cache = IncludeCache(check_files=False, stream_first=True)
 
-        tokens.extend(tokenizer.tokenize(''.join(lines)))
-        return cls(tokens)
+        if filename in seenfiles:
+            raise ConfigParseError("Circular include: %r" % (filename,))
+        seenfiles = seenfiles | {filename}
+
+        directives = []
+        if data.find(b'@include') != -1:
+            directives = list(INCLUDE_BYTES_RE.finditer(data))
+        if directives:
+            data = bytearray(data)
+            for m in directives:
+                data[m.start():m.end()] = b' ' * (m.end() - m.start())
+            data = bytes(data)
+
+        def include_tokens(m):
+            includefilename = decode_escapes(m.group(1).decode('utf-8'))
+            includefilename = os.path.join(includedir, includefilename)
+            return include_cache.tokens(
+                cls, includefilename, includedir=includedir,
+                seenfiles=seenfiles, includefiles=includefiles)
+
+        directives = iter(directives)
+        directive = next(directives, None)
+        for token in BytesTokenizer(filename, data).scan():
+            while directive is not None and directive.start() < token[2]:
+                for include_token in include_tokens(directive):
+                    yield include_token
+                directive = next(directives, None)
+            yield token
+
+        while directive is not None:
+            for include_token in include_tokens(directive):
+                yield include_token
+            directive = next(directives, None)
 
     def peek(self):
         '''Return (but do not consume) the next token
 
+        Tokens are compact ``(type, text, offset, lines)`` tuples, as produced
+        by ``Tokenizer.scan()``.
+
         At the end of input, ``None`` is returned.
         '''
 
-        if self.position >= len(self.tokens):
-            return None
+        return self.next_token
+
+    def consume(self):
+        '''Consume and return the next token, whatever its type
+
+        At the end of input, ``None`` is returned.
+        '''
 
-        return self.tokens[self.position]
+        token = self.next_token
+        if token is not None:
+            self.next_token = next(self.tokens, None)
+            self.position += 1
+        return token
 
     def accept(self, *args):
         '''Consume and return the next token if it has the correct type
@@ -292,14 +746,14 @@ class TokenStream:
         If the token type doesn't match, return None.
         '''
 
-        token = self.peek()
+        token = self.next_token
         if token is None:
             return None
 
-        for arg in args:
-            if token.type == arg:
-                self.position += 1
-                return token
+        if token[0] in args:
+            self.next_token = next(self.tokens, None)
+            self.position += 1
+            return token
 
         return None
 
@@ -324,11 +778,190 @@ class TokenStream:
             raise ConfigParseError("Unexpected end of input; %s" % (msg,))
         else:
             t = self.peek()
-            raise ConfigParseError("Unexpected token %s; %s" % (t, msg))
+            raise ConfigParseError("Unexpected token %s; %s" %
+                                   (format_token(t), msg))
 
     def finished(self):
         '''Return ``True`` if the end of the token stream is reached.'''
-        return self.position >= len(self.tokens)
+        return self.next_token is None
+
+
+class IncludeCache(object):
+    '''Cache of tokenized include files
+
+    Every file is tokenized once and its token list is handed out to all
+    ``@include`` directives referring to it. ``TokenStream.read_tokens()``
+    uses a fresh cache for every file it reads, so that repeated includes
+    within one ``load()`` are cheap. To share tokenized includes across
+    loads, pass an ``IncludeCache`` (e.g. ``default_include_cache``) to
+    ``load()``.
+
+    If ``check_files`` is true, an entry is only used if modification time
+    and size of the file and all files it includes are unchanged.
+
+    If ``stream_first`` is true, the tokens of a file are streamed the first
+    time it is included, without keeping them; only files included again
+    are kept as token lists. This keeps memory use flat for files included
+    once, as in ``iterparse()``.
+
+    ``opener`` is called with a file name to open include files for reading.
+    '''
+
+    def __init__(self, check_files=True, opener=open, stream_first=False):
+        self.check_files = check_files
+        self.opener = opener
+        self.stream_first = stream_first
+        self.entries = {}
+        self.streamed = set()
+        self.lock = threading.Lock()
+
+    def tokens(self, tokenstream_class, includefilename, includedir='',
+               seenfiles=frozenset(), includefiles=None):
+        '''Return the tokens of an include file
+
+        ``seenfiles`` and ``includefiles`` are handled like in
+        ``TokenStream.read_tokens()``, which is used to tokenize files not
+        found in the cache. The result is a list, or an iterator for a file
+        streamed because of ``stream_first``.
+        '''
+
+        key = (includefilename, includedir)
+        with self.lock:
+            entry = self.entries.get(key)
+            first = key not in self.streamed
+            if self.stream_first:
+                self.streamed.add(key)
+        if entry is None and self.stream_first and first:
+            if includefiles is not None:
+                includefiles.append(includefilename)
+            return self.stream(tokenstream_class, includefilename,
+                               includedir, seenfiles, includefiles)
+        if entry is not None and self.check_files and \
+                not files_unchanged(entry[2]):
+            entry = None
+
+        if entry is None:
+            entry = self.read(tokenstream_class, includefilename, includedir,
+                              seenfiles)
+            with self.lock:
+                self.entries[key] = entry
+        else:
+            # The cached file and its includes must not close a loop with
+            # the files currently being read.
+            for name in entry[1]:
+                if name in seenfiles:
+                    raise ConfigParseError("Circular include: %r" % (name,))
+
+        if includefiles is not None:
+            includefiles.extend(entry[1])
+        return entry[0]
+
+    def open(self, includefilename):
+        try:
+            return self.opener(includefilename)
+        except IOError:
+            raise ConfigParseError("Could not open include file %r" %
+                                   (includefilename,))
+
+    def stream(self, tokenstream_class, includefilename, includedir,
+               seenfiles, includefiles):
+        '''Generate the tokens of an include file without keeping them'''
+        with self.open(includefilename) as includefile:
+            for token in tokenstream_class.read_tokens(
+                    includefile, filename=includefilename,
+                    includedir=includedir, seenfiles=seenfiles,
+                    includefiles=includefiles, include_cache=self):
+                yield token
+
+    def read(self, tokenstream_class, includefilename, includedir, seenfiles):
+        '''Tokenize an include file, return a new cache entry for it'''
+        includefile = self.open(includefilename)
+        names = []
+        with includefile:
+            files = None
+            if self.check_files:
+                files = [(includefilename, file_state(includefilename))]
+            tokens = list(tokenstream_class.read_tokens(
+                includefile, filename=includefilename, includedir=includedir,
+                seenfiles=seenfiles, includefiles=names, include_cache=self))
+
+        if self.check_files:
+            files.extend((name, file_state(name)) for name in set(names))
+        return (tokens, [includefilename] + names, files)
+
+    def clear(self):
+        '''Remove all entries from the cache'''
+        with self.lock:
+            self.entries.clear()
+            self.streamed.clear()
+
+
+default_include_cache = IncludeCache()
+
+
+BRACKETS = {'{': '}', '(': ')', '[': ']'}
+CLOSING_BRACKETS = frozenset(BRACKETS.values())
+
+
+def parse_selection(paths):
+    '''Turn dotted setting paths into a tree of nested dicts
+
+    Each dict maps setting names to either ``True`` (select the whole value)
+    or another dict (select only parts of the group). For example,
+    ``['a.b', 'a.c', 'd']`` becomes ``{'a': {'b': True, 'c': True},
+    'd': True}``.
+    '''
+
+    tree = {}
+    for path in paths:
+        node = tree
+        names = path.split('.')
+        for name in names[:-1]:
+            child = node.setdefault(name, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[names[-1]] = True
+
+    return tree
+
+
+NUMERIC_TOKEN_TYPES = frozenset(['float', 'hex64', 'hex', 'integer64',
+                                 'integer'])
+INT64_TOKEN_TYPES = frozenset(['hex64', 'integer64'])
+
+
+def numeric_array(tokens):
+    '''Convert a list of numeric tokens to an ``array.array`` in bulk
+
+    Integers give typecode ``'i'`` if all of them fit into 32 bits and none
+    is an int64 literal, ``'q'`` otherwise. Floats give typecode ``'d'``.
+    Returns None for mixed integers and floats and for integers beyond 64
+    bits.
+    '''
+
+    types = set(t[0] for t in tokens)
+    if types == {'float'}:
+        return array.array('d', map(float, [t[1] for t in tokens]))
+    if 'float' in types:
+        return None
+
+    if types & INT64_TOKEN_TYPES:
+        typecodes = ['q']
+        texts = [t[1].rstrip('L') if t[0] in INT64_TOKEN_TYPES else t[1]
+                 for t in tokens]
+    else:
+        typecodes = ['i', 'q']
+        texts = [t[1] for t in tokens]
+    values = [int(text, 0) for text in texts]
+
+    for typecode in typecodes:
+        try:
+            return array.array(typecode, values)
+        except (OverflowError, ValueError):
+            pass  # ValueError: Python 2 has no typecode 'q'.
+    return None
 
 
 class Parser:
@@ -336,10 +969,53 @@ class Parser:
 
     Takes a ``TokenStream`` as input, the ``parse()`` method then returns
     the config file data in a ``json``-module-style format.
+
+    ``value()`` and ``scalar_value()`` are table driven: they peek at the
+    type of the next token once and call the matching production directly.
+
+    If ``select`` is given, only the settings at these dotted paths (e.g.
+    ``'database.pool'``) are built, along with the groups leading to them.
+    All other values are skipped by matching brackets, without converting
+    any tokens.
+
+    If ``typed_arrays`` is true, arrays consisting only of integers or only
+    of floats are returned as ``array.array`` instances, see
+    ``typed_array()``.
+
+    Containers are built by calling ``dict_factory`` with a list of
+    ``(name, value)`` pairs for groups, ``list_factory`` with a list of the
+    values of a list, and ``array_factory`` with a list of the values of an
+    array. Duplicate setting names are passed on to ``dict_factory``.
+
+    If ``intern_names`` is true, setting names are interned, so that all
+    settings of the same name share one string object. String values of up
+    to ``intern_strings`` characters are interned as well.
     '''
 
-    def __init__(self, tokenstream):
+    # Functions converting token text to values, for all scalar token types.
+    converters = dict((type, cls.convert)
+                      for cls, type, regex in Tokenizer.token_map
+                      if cls is not Token)
+
+    def __init__(self, tokenstream, select=None, typed_arrays=False,
+                 dict_factory=AttrDict, list_factory=tuple,
+                 array_factory=list, intern_names=False, intern_strings=0):
         self.tokens = tokenstream
+        self.selection = None if select is None else parse_selection(select)
+        self.typed_arrays = typed_arrays
+        self.dict_factory = dict_factory
+        self.list_factory = list_factory
+        self.array_factory = array_factory
+        self.intern_names = intern_names
+        self.intern_strings = intern_strings
+
+        self.scalar_productions = dict.fromkeys(self.converters,
+                                                self._scalar_token)
+        self.scalar_productions['string'] = self.string
+        self.value_productions = dict(self.scalar_productions)
+        self.value_productions.update({'[': self.array,
+                                       '(': self.list,
+                                       '{': self.group})
 
     def parse(self):
         return self.configuration()
@@ -348,52 +1024,168 @@ class Parser:
         result = self.setting_list_or_empty()
         if not self.tokens.finished():
             raise ConfigParseError("Expected end of input but found %s" %
-                                   (self.tokens.peek(),))
+                                   (format_token(self.tokens.peek()),))
 
         return result
 
     def setting_list_or_empty(self):
-        result = AttrDict()
+        settings = []
         while True:
             s = self.setting()
             if s is None:
-                return result
+                return self.dict_factory(settings)
 
-            result[s[0]] = s[1]
+            settings.append(s)
 
     def setting(self):
-        name = self.tokens.accept('name')
-        if name is None:
-            return None
+        while True:
+            name = self.tokens.accept('name')
+            if name is None:
+                return None
 
-        self.tokens.expect(':', '=')
+            self.tokens.expect(':', '=')
 
-        value = self.value()
-        if value is None:
-            self.tokens.error("expected a value")
+            selection = self.selection
+            if selection is None:
+                value = self.value()
+            else:
+                child_selection = self._child_selection(selection, name[1])
+                if child_selection is False:
+                    self._skip_setting_value()
+                    continue
+                self.selection = child_selection
+                value = self.value()
+                self.selection = selection
+
+            if value is None:
+                self.tokens.error("expected a value")
+
+            self.tokens.accept(';', ',')
+
+            if self.intern_names:
+                return (intern_string(name[1]), value)
+            return (name[1], value)
+
+    def skip_value(self, record=None):
+        '''Consume the next value without building it
+
+        Groups, lists and arrays are skipped by matching brackets, their
+        contents are not checked further. Returns ``False`` if the next token
+        doesn't start a value. If ``record`` is given, it is called with every
+        token of a skipped group, list or array.
+        '''
 
+        tokens = self.tokens
+        token = tokens.peek()
+        type = None if token is None else token[0]
+        if type == 'string':
+            while tokens.accept('string'):
+                pass
+            return True
+        if type in self.converters:
+            tokens.consume()
+            return True
+        if type not in BRACKETS:
+            return False
+
+        closing = []
+        while True:
+            token = tokens.consume()
+            if token is None:
+                tokens.error("expected: %r" % ((closing[-1],),))
+            if record is not None:
+                record(token)
+            type = token[0]
+            if type in BRACKETS:
+                closing.append(BRACKETS[type])
+            elif type in CLOSING_BRACKETS:
+                expected = closing.pop()
+                if type != expected:
+                    raise ConfigParseError(
+                        "Unexpected token %s; expected: %r" %
+                        (format_token(token), (expected,)))
+                if not closing:
+                    return True
+
+    def _skip_setting_value(self):
+        if not self.skip_value():
+            self.tokens.error("expected a value")
         self.tokens.accept(';', ',')
 
-        return (name.text, value)
+    def _child_selection(self, selection, name):
+        '''Return the selection for the value of setting ``name``
+
+        ``None`` means the value is selected as a whole, a dict that only some
+        settings of the value (which must then be a group) are selected, and
+        ``False`` that the value is to be skipped.
+        '''
+
+        child_selection = selection.get(name, False)
+        if child_selection is True:
+            return None
+        if child_selection is not False:
+            token = self.tokens.peek()
+            if token is None or token[0] != '{':
+                return False
+        return child_selection
 
     def value(self):
-        acceptable = [self.scalar_value, self.array, self.list, self.group]
-        return self._parse_any_of(acceptable)
+        return self._dispatch(self.value_productions)
 
     def scalar_value(self):
-        # This list is ordered so that more common tokens are checked first.
-        acceptable = [self.string, self.boolean, self.integer, self.float,
-                      self.hex, self.integer64, self.hex64]
-        return self._parse_any_of(acceptable)
+        return self._dispatch(self.scalar_productions)
 
     def value_list_or_empty(self):
-        return tuple(self._comma_separated_list_or_empty(self.value))
+        return self.list_factory(
+            self._comma_separated_list_or_empty(self.value))
 
     def scalar_value_list_or_empty(self):
         return self._comma_separated_list_or_empty(self.scalar_value)
 
     def array(self):
-        return self._enclosed_block('[', self.scalar_value_list_or_empty, ']')
+        if self.typed_arrays:
+            return self.typed_array()
+        values = self._enclosed_block('[', self.scalar_value_list_or_empty,
+                                      ']')
+        if values is None or self.array_factory is list:
+            return values
+        return self.array_factory(values)
+
+    def typed_array(self):
+        '''Parse an array, using ``array.array`` for numeric arrays
+
+        Numeric tokens are collected first and then converted in bulk by
+        ``numeric_array()``. Arrays it can't handle, e.g. empty or mixed
+        ones, give a plain list, as without ``typed_arrays``.
+        '''
+
+        tokens = self.tokens
+        tokens.expect('[')
+
+        numbers = []
+        more = True  # A comma was read, more values may follow.
+        while True:
+            token = tokens.peek()
+            if token is None or token[0] not in NUMERIC_TOKEN_TYPES:
+                break
+            numbers.append(tokens.consume())
+            if not tokens.accept(','):
+                more = False
+                break
+
+        if numbers and (not more or (token is not None and token[0] == ']')):
+            result = numeric_array(numbers)
+            if result is not None:
+                tokens.expect(']')
+                return result
+
+        values = [self.converters[t[0]](t[1]) for t in numbers]
+        if more:
+            values.extend(self.scalar_value_list_or_empty())
+        tokens.expect(']')
+        if self.array_factory is list:
+            return values
+        return self.array_factory(values)
 
     def list(self):
         return self._enclosed_block('(', self.value_list_or_empty, ')')
@@ -424,29 +1216,39 @@ class Parser:
         if t_first is None:
             return None
 
-        values = [t_first.value]
+        values = [StrToken.convert(t_first[1])]
         while True:
             t = self.tokens.accept('string')
             if t is None:
                 break
-            values.append(t.value)
+            values.append(StrToken.convert(t[1]))
 
-        return ''.join(values)
+        value = ''.join(values)
+        if len(value) <= self.intern_strings:
+            return intern_string(value)
+        return value
 
     def _create_value_node(self, tokentype):
         t = self.tokens.accept(tokentype)
         if t is None:
             return None
 
-        return t.value
+        return self.converters[tokentype](t[1])
 
-    def _parse_any_of(self, nonterminals):
-        for fun in nonterminals:
-            result = fun()
-            if result is not None:
-                return result
+    def _scalar_token(self):
+        t = self.tokens.consume()
+        return self.converters[t[0]](t[1])
 
-        return None
+    def _dispatch(self, productions):
+        token = self.tokens.peek()
+        if token is None:
+            return None
+
+        production = productions.get(token[0])
+        if production is None:
+            return None
+
+        return production()
 
     def _comma_separated_list_or_empty(self, nonterminal):
         values = []
@@ -467,62 +1269,1368 @@ class Parser:
         return result
 
 
-def load(f, filename=None, includedir=''):
-    '''Load the contents of ``f`` (a file-like object) to a Python object
+class IterativeParser(Parser):
+    '''Parser for libconfig files that does not recurse on nested values
 
-    The returned object is a subclass of ``dict`` that exposes string keys as
-    attributes as well.
+    Produces the same results and errors as ``Parser``, but keeps open
+    groups and lists on an explicit stack. Nesting depth is therefore not
+    limited by the Python recursion limit.
+    '''
 
-    Example:
+    def value(self):
+        tokens = self.tokens
+        scalars = self.scalar_productions
 
-        >>> with open('test/example.cfg') as f:
-        ...     config = libconf.load(f)
-        >>> config['window']['title']
-        'libconfig example'
-        >>> config.window.title
-        'libconfig example'
-    '''
+        # Stack frames are [closing token type, values, pending key] for
+        # lists, groups add the selection of their settings. Groups collect
+        # (name, value) pairs.
+        stack = []
+        while True:
+            # Parse the start of a value, opening groups and lists.
+            token = tokens.peek()
+            type = None if token is None else token[0]
+            if type in scalars:
+                value = scalars[type]()
+            elif type == '[':
+                value = self.array()
+            elif type == '(':
+                tokens.consume()
+                stack.append([')', [], None])
+                continue
+            elif type == '{':
+                tokens.consume()
+                frame = ['}', [], None, self.selection]
+                stack.append(frame)
+                if self._next_group_setting(frame):
+                    continue
+                value = self.dict_factory(stack.pop()[1])
+            elif not stack:
+                return None
+            elif stack[-1][0] == '}':
+                tokens.error("expected a value")
+            else:
+                # A list without further items.
+                tokens.expect(')')
+                value = self.list_factory(stack.pop()[1])
+
+            # Add the value to its container, closing all finished ones.
+            while stack:
+                frame = stack[-1]
+                if frame[0] == '}':
+                    frame[1].append((frame[2], value))
+                    tokens.accept(';', ',')
+                    if self._next_group_setting(frame):
+                        break
+                    value = self.dict_factory(stack.pop()[1])
+                else:
+                    frame[1].append(value)
+                    if tokens.accept(','):
+                        break
+                    tokens.expect(')')
+                    value = self.list_factory(stack.pop()[1])
+            else:
+                return value
 
-    if isinstance(f.read(0), bytes):
-        raise TypeError("libconf.load() input file must by unicode")
+    def _next_group_setting(self, frame):
+        '''Start the next setting of a group, or consume the closing brace
 
-    tokenstream = TokenStream.from_file(f,
-                                        filename=filename,
-                                        includedir=includedir)
-    return Parser(tokenstream).parse()
+        Returns ``True`` if a setting name was read and its value is due.
+        '''
+
+        while True:
+            name = self.tokens.accept('name')
+            if name is None:
+                self.tokens.expect('}')
+                return False
+
+            self.tokens.expect(':', '=')
+            selection = frame[3]
+            if selection is not None:
+                selection = self._child_selection(selection, name[1])
+                if selection is False:
+                    self._skip_setting_value()
+                    continue
+
+            self.selection = selection
+            frame[2] = intern_string(name[1]) if self.intern_names else name[1]
+            return True
+
+    def events(self):
+        '''Generate parse events instead of building the configuration
+
+        Yields ``(event, value)`` tuples, where ``event`` is one of
+        ``'start_group'``, ``'end_group'``, ``'start_list'``, ``'end_list'``,
+        ``'start_array'``, ``'end_array'``, ``'key'`` or ``'scalar'``. The
+        value is the setting name for ``'key'`` events, the Python value for
+        ``'scalar'`` events and ``None`` otherwise. The top level settings are
+        reported as a group, too.
+
+        No containers are built, so memory use does not depend on the size of
+        the input.
+        '''
 
+        tokens = self.tokens
+        scalars = self.scalar_productions
 
-def loads(string, filename=None, includedir=''):
-    '''Load the contents of ``string`` to a Python object
+        # Closing token types of open groups and lists; None for top level.
+        stack = [None]
+        yield ('start_group', None)
+        while True:
+            top = stack[-1]
+            if top == ')':
+                name = None
+            else:
+                name = tokens.accept('name')
+                if name is None:
+                    if top is None:
+                        if not tokens.finished():
+                            raise ConfigParseError(
+                                "Expected end of input but found %s" %
+                                (format_token(tokens.peek()),))
+                        yield ('end_group', None)
+                        return
+                    tokens.expect('}')
+                    stack.pop()
+                    yield ('end_group', None)
+                else:
+                    tokens.expect(':', '=')
+                    yield ('key', name[1])
+
+            if name is not None or top == ')':
+                token = tokens.peek()
+                type = None if token is None else token[0]
+                if type in scalars:
+                    yield ('scalar', scalars[type]())
+                elif type == '[':
+                    for event in self._array_events():
+                        yield event
+                elif type == '{' or type == '(':
+                    tokens.consume()
+                    stack.append('}' if type == '{' else ')')
+                    yield ('start_group' if type == '{' else 'start_list',
+                           None)
+                    continue
+                elif top != ')':
+                    tokens.error("expected a value")
+                else:
+                    # A list without further items.
+                    tokens.expect(')')
+                    stack.pop()
+                    yield ('end_list', None)
+
+            # A value is complete: consume separators, close finished lists.
+            while stack[-1] == ')':
+                if tokens.accept(','):
+                    break
+                tokens.expect(')')
+                stack.pop()
+                yield ('end_list', None)
+            else:
+                tokens.accept(';', ',')
 
-    The returned object is a subclass of ``dict`` that exposes string keys as
-    attributes as well.
+    def _array_events(self):
+        self.tokens.expect('[')
+        yield ('start_array', None)
+        while True:
+            value = self.scalar_value()
+            if value is None:
+                break
+            yield ('scalar', value)
+            if not self.tokens.accept(','):
+                break
+        self.tokens.expect(']')
+        yield ('end_array', None)
 
-    Example:
 
-        >>> config = libconf.loads('window: { title: "libconfig example"; };')
-        >>> config['window']['title']
-        'libconfig example'
-        >>> config.window.title
-        'libconfig example'
+class LazyGroup(object):
+    '''Placeholder for an unparsed group value in a LazyAttrDict
+
+    Holds the texts of the group's tokens joined into one string, which
+    ``parse()`` tokenizes again, plus the token offsets and a list of
+    ``(index, lines)`` pairs giving the ``LineIndex`` of the tokens from
+    ``index`` on, so that errors report the original locations. This takes
+    a fraction of the memory of the token tuples. ``selection`` (cf.
+    ``parse_selection()``) applies to the group, ``options`` are passed on
+    to the ``LazyParser`` parsing it.
     '''
+    __slots__ = ('text', 'offsets', 'lines', 'selection', 'options')
 
-    try:
-        f = io.StringIO(string)
-    except TypeError:
-        raise TypeError("libconf.loads() input string must by unicode")
+    def __init__(self, text, offsets, lines, selection, options):
+        self.text = text
+        self.offsets = offsets
+        self.lines = lines
+        self.selection = selection
+        self.options = options
+
+    def tokens(self):
+        '''Generate the tokens of the group, with their original locations'''
+        offsets = self.offsets
+        runs = self.lines
+        run = 0
+        lines = runs[0][1]
+        for i, token in enumerate(Tokenizer('<lazy>').scan(self.text)):
+            if run + 1 < len(runs) and runs[run + 1][0] == i:
+                run += 1
+                lines = runs[run][1]
+            yield (token[0], token[1], offsets[i], lines)
 
-    return load(f, filename=filename, includedir=includedir)
+    def parse(self):
+        '''Parse the group into a LazyAttrDict'''
+        parser = LazyParser(TokenStream(self.tokens()), **self.options)
+        parser.selection = self.selection
+        return parser.group()
 
 
-# dump() logic
-##############
+class LazyParser(Parser):
+    '''Parser returning a LazyAttrDict, leaving group values unparsed
 
-class LibconfList(tuple):
-    pass
+    Group values of settings are skipped by matching brackets and recorded
+    as ``LazyGroup`` objects, to be parsed when they are first accessed.
+    Groups within lists are parsed along with their list.
 
+    Unparsed groups keep their token texts joined into a string and an
+    offset per token, and parsing them tokenizes this text again. Reading a
+    few keys of a large input is therefore cheaper than ``load()`` in time
+    and memory, but resolving all groups takes longer.
 
-class LibconfArray(list):
+    Groups are always ``LazyAttrDict`` instances, so ``dict_factory`` can't
+    be changed.
+    '''
+
+    def __init__(self, tokenstream, select=None, **options):
+        if options.get('dict_factory', AttrDict) is not AttrDict:
+            raise ValueError("LazyParser does not support dict_factory")
+
+        Parser.__init__(self, tokenstream, select=select, **options)
+        self.options = options
+        self.list_depth = 0
+
+    def setting_list_or_empty(self):
+        if self.list_depth:
+            return Parser.setting_list_or_empty(self)
+
+        result = LazyAttrDict()
+        while True:
+            s = self.setting()
+            if s is None:
+                return result
+
+            result[s[0]] = s[1]
+
+    def value(self):
+        token = self.tokens.peek()
+        if self.list_depth or token is None or token[0] != '{':
+            return Parser.value(self)
+
+        tokens = []
+        self.skip_value(tokens.append)
+
+        texts = [token[1] for token in tokens]
+        try:
+            text = ' '.join(texts)
+        except TypeError:
+            # Numbers from BytesTokenizer are bytes.
+            text = ' '.join(t if isstr(t) else t.decode('ascii')
+                            for t in texts)
+        offsets = array.array('l', [token[2] for token in tokens])
+        runs = [(0, tokens[0][3])]
+        if len(set(token[3] for token in tokens)) > 1:
+            runs = [(i, token[3]) for i, token in enumerate(tokens)
+                    if i == 0 or token[3] is not tokens[i - 1][3]]
+        return LazyGroup(text, offsets, runs, self.selection, self.options)
+
+    def list(self):
+        self.list_depth += 1
+        try:
+            return Parser.list(self)
+        finally:
+            self.list_depth -= 1
+
+
+def load(f, filename=None, includedir='', parser=Parser, select=None,
+         cache_dir=None, include_cache=None, typed_arrays=False,
+         dict_factory=AttrDict, list_factory=tuple, array_factory=list,
+         intern_names=False, intern_strings=0):
+    '''Load the contents of ``f`` (a file-like object) to a Python object
+
+    The returned object is a subclass of ``dict`` that exposes string keys as
+    attributes as well.
+
+    ``parser`` selects the parsing engine. The default, ``Parser``, is a
+    recursive descent parser; ``IterativeParser`` handles arbitrarily deep
+    nesting of groups and lists without running into ``RecursionError``.
+    ``LazyParser`` returns a ``LazyAttrDict``, which only parses groups when
+    they are first accessed.
+
+    ``select`` is an optional list of dotted setting paths, such as
+    ``['database.pool', 'logging']``. If it is given, only these settings
+    (and the groups containing them) are built, everything else is skipped.
+
+    If ``typed_arrays`` is true, arrays of integers or floats are returned as
+    ``array.array`` instances, which store 4 or 8 bytes per element.
+
+    ``dict_factory``, ``list_factory`` and ``array_factory`` build groups,
+    lists and arrays, similar to ``object_pairs_hook`` in the ``json``
+    module. ``dict_factory`` is called with a list of ``(name, value)``
+    pairs, the others with a list of values. ``SlimAttrDict`` is a more
+    compact ``dict_factory`` than the default ``AttrDict``. ``LazyParser``
+    does not support ``dict_factory``.
+
+    With ``intern_names=True``, setting names are interned, which saves
+    memory if many groups share the same setting names. ``intern_strings``
+    sets a maximum length for string values to be interned as well.
+
+    If ``cache_dir`` is given, parse results are cached in this directory
+    (cf. ``DiskCache``). As long as neither ``f`` nor any file it includes
+    changes, later calls return the cached result without parsing.
+
+    Included files are streamed when first included and tokenized at most
+    once more per call, when included again. Pass an ``IncludeCache``, such
+    as ``libconf.default_include_cache``, as ``include_cache`` to reuse them
+    across calls as well.
+
+    Example:
+
+        >>> with open('test/example.cfg') as f:
+        ...     config = libconf.load(f)
+        >>> config['window']['title']
+        'libconfig example'
+        >>> config.window.title
+        'libconfig example'
+    '''
+
+    if isinstance(f.read(0), bytes):
+        raise TypeError("libconf.load() input file must by unicode")
+
+    if cache_dir is not None:
+        return DiskCache(cache_dir).load(f, filename=filename,
+                                         includedir=includedir,
+                                         parser=parser,
+                                         include_cache=include_cache,
+                                         select=select,
+                                         typed_arrays=typed_arrays,
+                                         dict_factory=dict_factory,
+                                         list_factory=list_factory,
+                                         array_factory=array_factory,
+                                         intern_names=intern_names,
+                                         intern_strings=intern_strings)
+
+    tokenstream = TokenStream.from_file(f,
+                                        filename=filename,
+                                        includedir=includedir,
+                                        include_cache=include_cache)
+    return parser(tokenstream, select=select, typed_arrays=typed_arrays,
+                  dict_factory=dict_factory, list_factory=list_factory,
+                  array_factory=array_factory, intern_names=intern_names,
+                  intern_strings=intern_strings).parse()
+
+
+def loads(string, filename=None, includedir='', parser=Parser, select=None,
+          include_cache=None, typed_arrays=False, dict_factory=AttrDict,
+          list_factory=tuple, array_factory=list, intern_names=False,
+          intern_strings=0):
+    '''Load the contents of ``string`` to a Python object
+
+    The returned object is a subclass of ``dict`` that exposes string keys as
+    attributes as well.
+
+    Example:
+
+        >>> config = libconf.loads('window: { title: "libconfig example"; };')
+        >>> config['window']['title']
+        'libconfig example'
+        >>> config.window.title
+        'libconfig example'
+    '''
+
+    try:
+        f = io.StringIO(string)
+    except TypeError:
+        raise TypeError("libconf.loads() input string must by unicode")
+
+    return load(f, filename=filename, includedir=includedir, parser=parser,
+                select=select, include_cache=include_cache,
+                typed_arrays=typed_arrays, dict_factory=dict_factory,
+                list_factory=list_factory, array_factory=array_factory,
+                intern_names=intern_names, intern_strings=intern_strings)
+
+
+def load_bytes(data, filename=None, includedir='', parser=Parser,
+               select=None, include_cache=None, typed_arrays=False,
+               dict_factory=AttrDict, list_factory=tuple, array_factory=list,
+               intern_names=False, intern_strings=0):
+    '''Load UTF-8 encoded ``data`` to a Python object
+
+    ``data`` can be ``bytes`` or any other buffer object, e.g. an ``mmap``.
+    Instead of decoding the whole input up front, only string literals and
+    setting names are decoded. Token locations in error messages are still
+    given in characters.
+
+    Outside of string literals, the tokenizer only recognizes ASCII
+    whitespace and digits. If ``data`` fails to parse and contains non-ASCII
+    characters, it is decoded and parsed again like ``loads()`` does, which
+    accepts e.g. non-breaking spaces between tokens as well.
+
+    The other arguments are the same as for ``load()``.
+    '''
+
+    options = dict(select=select, typed_arrays=typed_arrays,
+                   dict_factory=dict_factory, list_factory=list_factory,
+                   array_factory=array_factory, intern_names=intern_names,
+                   intern_strings=intern_strings)
+    tokenstream = TokenStream(TokenStream.read_bytes_tokens(
+        data, filename=filename, includedir=includedir,
+        include_cache=include_cache))
+    try:
+        return parser(tokenstream, **options).parse()
+    except ConfigParseError as e:
+        text = None
+        if NON_ASCII_BYTES_RE.search(data) is not None:
+            try:
+                text = data[:].decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+        if text is None:
+            raise e
+    return loads(text, filename=filename, includedir=includedir,
+                 parser=parser, include_cache=include_cache, **options)
+
+
+def load_path(path, includedir='', parser=Parser, select=None,
+              include_cache=None, typed_arrays=False, dict_factory=AttrDict,
+              list_factory=tuple, array_factory=list, intern_names=False,
+              intern_strings=0):
+    '''Load the UTF-8 encoded file at ``path`` by memory-mapping it
+
+    This avoids reading and decoding a copy of the whole file, see
+    ``load_bytes()``. Included files are read normally.
+
+    The mapping is released when no longer needed; with ``LazyParser``,
+    this is only the case once the result is gone.
+    '''
+
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            data = b''  # Empty files can't be mapped.
+    return load_bytes(data, filename=path, includedir=includedir,
+                      parser=parser, select=select,
+                      include_cache=include_cache, typed_arrays=typed_arrays,
+                      dict_factory=dict_factory, list_factory=list_factory,
+                      array_factory=array_factory, intern_names=intern_names,
+                      intern_strings=intern_strings)
+
+
+def iterparse(f, filename=None, includedir=''):
+    '''Generate parse events for the contents of ``f`` (a file-like object)
+
+    Instead of building the configuration in memory, this yields
+    ``(event, value)`` tuples as the input is read, in the style of ijson.
+    See ``IterativeParser.events()`` for the events produced.
+
+    Example:
+
+        >>> with open('test/example.cfg') as f:
+        ...     events = libconf.iterparse(f)
+        ...     for event, value in events:
+        ...         if (event, value) == ('key', 'title'):
+        ...             print(next(events))
+        ('scalar', 'libconfig example')
+    '''
+
+    if isinstance(f.read(0), bytes):
+        raise TypeError("libconf.iterparse() input file must by unicode")
+
+    tokenstream = TokenStream.from_file(f,
+                                        filename=filename,
+                                        includedir=includedir)
+    return IterativeParser(tokenstream).events()
+
+
+class IncrementalConfig(object):
+    '''Parse result of an input string that is kept up-to-date with edits
+
+    ``config`` is the parsed configuration of ``text``, as ``loads()`` would
+    return it. After ``edit()``, only the top-level settings touched by the
+    edit are tokenized and parsed again, and spliced into ``config``; the
+    dict object itself is kept, so references to it stay valid.
+
+    A full parse is done instead if the input has ``@include`` directives,
+    if the previous text failed to parse, or if the edited settings can't be
+    parsed on their own, e.g. because the edit opened a group or a string
+    that continues into the following settings. ``full_parses`` counts the
+    full parses done so far.
+
+    ``parser`` must be ``Parser`` or ``IterativeParser``; the other
+    arguments are the same as for ``loads()``, except that ``select`` is not
+    supported.
+    '''
+
+    # Characters that end a token without it possibly continuing.
+    separators = frozenset(' \t\r\n\f\v;,)]}')
+
+    def __init__(self, string, filename=None, includedir='', parser=Parser,
+                 **options):
+        if parser not in (Parser, IterativeParser):
+            raise ValueError("IncrementalConfig does not support parser %r" %
+                             (parser,))
+        if options.get('select') is not None:
+            raise ValueError("IncrementalConfig does not support select")
+
+        self.text = string
+        self.filename = '<unknown>' if filename is None else filename
+        self.includedir = includedir
+        self.parser = parser
+        self.options = options
+        self.dict_factory = options.get('dict_factory', AttrDict)
+        self.config = None
+        self.full_parses = 0
+        self.pairs = None
+        self.starts = None  # Start offsets of the top-level settings.
+        self.parse()
+
+    def edit(self, offset, deleted, inserted):
+        '''Replace ``deleted`` characters at ``offset`` with ``inserted``
+
+        Return the updated configuration. If the new text doesn't parse,
+        ``ConfigParseError`` is raised and ``config`` keeps the last valid
+        result; the next edit then parses the whole text again.
+        '''
+
+        text = self.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError("Edit outside of the text: offset %d, "
+                             "deleted %d, length %d" %
+                             (offset, deleted, len(text)))
+
+        self.text = text[:offset] + inserted + text[offset + deleted:]
+        if self.starts is None or not self.reparse(offset, deleted,
+                                                   len(inserted)):
+            self.parse()
+        return self.config
+
+    def parse(self):
+        '''Parse the whole text'''
+        self.pairs = self.starts = None
+        self.full_parses += 1
+        if '@include' in self.text:
+            config = loads(self.text, filename=self.filename,
+                           includedir=self.includedir, parser=self.parser,
+                           **self.options)
+            self.update_config(config)
+            return
+
+        tokens = Tokenizer(self.filename).scan(self.text)
+        pairs, starts = self.parse_settings(tokens)
+        self.update_config(self.dict_factory(pairs))
+        self.pairs = pairs
+        self.starts = starts
+
+    def reparse(self, offset, deleted, inserted):
+        '''Parse the top-level settings affected by an edit
+
+        The region parsed again extends from the start of the setting
+        containing ``offset`` (or the start of the input) to the start of
+        the first setting beyond the edit (or the end of the input). Return
+        ``False`` if the region can't be tokenized or parsed on its own.
+        '''
+
+        text = self.text
+        starts = self.starts
+        delta = inserted - deleted
+        i = bisect.bisect_right(starts, offset) - 1
+        j = bisect.bisect_right(starts, offset + deleted)
+        lo = starts[i] if i >= 0 else 0
+        hi = starts[j] + delta if j < len(starts) else len(text)
+        i = max(i, 0)
+
+        if lo and text[lo - 1] not in self.separators:
+            return False  # The previous token might continue into the edit.
+        if '@include' in text[max(lo - 8, 0):hi + 8]:
+            return False
+
+        tokens = self.scan(lo, hi)
+        if tokens is None:
+            return False
+        try:
+            pairs, region_starts = self.parse_settings(tokens)
+        except (ConfigParseError, ValueError):
+            return False  # ValueError: e.g. a float token of just '.'.
+
+        old_names = [name for name, value in self.pairs[i:j]]
+        self.pairs[i:j] = pairs
+        starts[i:j] = region_starts
+        if delta:
+            k = i + len(region_starts)
+            starts[k:] = [start + delta for start in starts[k:]]
+
+        config = self.config
+        if (old_names == [name for name, value in pairs] and
+                len(config) == len(self.pairs)):
+            # Same settings as before and no duplicate names, so the values
+            # can be replaced in place.
+            for name, value in pairs:
+                config[name] = value
+        else:
+            self.update_config(self.dict_factory(self.pairs))
+        return True
+
+    def scan(self, lo, hi):
+        '''Return the tokens of ``text[lo:hi]``, or None
+
+        The text is scanned in context, so None is returned if a token or
+        comment continues beyond ``hi``, as well as for invalid input.
+        '''
+
+        groups = Tokenizer.master_groups
+        lines = LineIndex(self.filename)  # Only used for error messages.
+        tokens = []
+        for m in Tokenizer.master_regex.finditer(self.text, lo):
+            if m.end() > hi:
+                if m.start() < hi:
+                    return None
+                break
+
+            kind = m.lastgroup
+            if kind == 'skip':
+                continue
+            if kind == 'error':
+                return None
+            tokens.append((groups[kind], m.group(0), m.start(), lines))
+        return tokens
+
+    def parse_settings(self, tokens):
+        '''Parse top-level settings from ``tokens``
+
+        Return a list of ``(name, value)`` pairs and a list of the start
+        offsets of the settings.
+        '''
+
+        tokenstream = TokenStream(tokens)
+        parser = self.parser(tokenstream, **self.options)
+        pairs = []
+        starts = []
+        while not tokenstream.finished():
+            start = tokenstream.peek()[2]
+            setting = parser.setting()
+            if setting is None:
+                raise ConfigParseError("Expected end of input but found %s" %
+                                       (format_token(tokenstream.peek()),))
+            pairs.append(setting)
+            starts.append(start)
+        return pairs, starts
+
+    def update_config(self, config):
+        '''Make ``config`` the current result, keeping the old dict object'''
+        if isinstance(self.config, dict) and isinstance(config, dict):
+            self.config.clear()
+            self.config.update(config)
+        else:
+            self.config = config
+
+
+def file_state(path, hash_contents=False):
+    '''Return a tuple describing the current state of file ``path``
+
+    The tuple holds modification time, size and, if ``hash_contents`` is
+    true, a hash of the file contents.
+    '''
+
+    st = os.stat(path)
+    digest = None
+    if hash_contents:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).digest()
+    return (st.st_mtime, st.st_size, digest)
+
+
+def files_unchanged(files, hash_contents=False):
+    '''Check a list of ``(path, file_state(path))`` tuples for changes
+
+    Returns False if any file was modified or can't be accessed anymore.
+    '''
+
+    try:
+        return all(file_state(path, hash_contents) == state
+                   for path, state in files)
+    except (IOError, OSError):
+        return False
+
+
+def qualified_name(value):
+    '''Return ``(module, name)`` under which ``value`` can be imported
+
+    Returns None if ``value`` can't be found that way, e.g. for lambdas,
+    nested functions, bound methods and ``functools.partial`` objects.
+    '''
+
+    module = getattr(value, '__module__', None)
+    name = getattr(value, '__qualname__', getattr(value, '__name__', None))
+    if not isstr(module) or not isstr(name) or '<' in name:
+        return None
+    obj = sys.modules.get(module)
+    for part in name.split('.'):
+        obj = getattr(obj, part, None)
+    return (module, name) if obj is value else None
+
+
+class DiskCache(object):
+    '''Persistent cache of parsed configuration files in ``directory``
+
+    Used by ``load()`` if it's called with a ``cache_dir``. Each result is
+    pickled into its own file, together with the state of the source file
+    and all files it includes. A cached result is only used if none of these
+    files changed since.
+
+    Cache files are unpickled, so the cache directory must not be writable
+    by untrusted users.
+    '''
+
+    # Stored along with each result, change it when the format changes.
+    format = ('libconf-cache', 1)
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def load(self, f, filename=None, includedir='', parser=Parser,
+             include_cache=None, **options):
+        '''Like ``load()``, but use the cached result if it is up-to-date
+
+        ``options`` are passed on to ``parser``; ``select``, ``typed_arrays``
+        and the container factories of ``load()`` are such options. Files
+        without a name on disk, and factories that can't be imported by name
+        (like lambdas), are simply loaded without caching.
+        '''
+
+        # Factories are identified by name, their repr() differs between
+        # processes.
+        key_options = []
+        for name, value in sorted(options.items()):
+            if callable(value):
+                value = qualified_name(value)
+                if value is None:
+                    key_options = None
+                    break
+            key_options.append((name, value))
+
+        parser_name = qualified_name(parser)
+        path = filename if filename is not None else getattr(f, 'name', None)
+        if (not isstr(path) or not os.path.isfile(path) or
+                key_options is None or parser_name is None):
+            return load(f, filename=filename, includedir=includedir,
+                        parser=parser, include_cache=include_cache,
+                        **options)
+
+        key = repr((os.path.abspath(path), includedir, parser_name,
+                    key_options))
+        cache_file = os.path.join(
+            self.directory,
+            hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pickle')
+        result = self.read(cache_file, key)
+        if result is not None:
+            return result
+
+        main_state = file_state(path)
+        includefiles = []
+        tokenstream = TokenStream.from_file(f, filename=filename,
+                                            includedir=includedir,
+                                            includefiles=includefiles,
+                                            include_cache=include_cache)
+        result = parser(tokenstream, **options).parse()
+
+        files = [(os.path.abspath(path), main_state)]
+        files.extend((os.path.abspath(name), file_state(name))
+                     for name in set(includefiles))
+        self.write(cache_file, key, files, result)
+        return result
+
+    def read(self, cache_file, key):
+        '''Return the result stored in ``cache_file``, None if it's stale'''
+        try:
+            with open(cache_file, 'rb') as f:
+                format, stored_key, files, result = pickle.load(f)
+        except Exception:
+            # Missing, truncated or otherwise unusable cache file.
+            return None
+
+        if format != self.format or stored_key != key:
+            return None
+        if not files_unchanged(files):
+            return None
+        return result
+
+    def write(self, cache_file, key, files, result):
+        '''Store ``result`` in ``cache_file``, ignoring errors'''
+        tmp_file = None
+        try:
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                if not os.path.isdir(self.directory):
+                    raise
+            # A unique name, as other threads or processes may write the
+            # same cache file concurrently.
+            fd, tmp_file = tempfile.mkstemp(
+                prefix=os.path.basename(cache_file) + '.', suffix='.tmp',
+                dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((self.format, key, files, result), f,
+                            pickle.HIGHEST_PROTOCOL)
+            getattr(os, 'replace', os.rename)(tmp_file, cache_file)
+        except (IOError, OSError, RuntimeError, pickle.PicklingError):
+            # Caching is best effort. RuntimeError covers RecursionError
+            # for very deeply nested configurations.
+            if tmp_file is not None and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
+class FrozenAttrDict(AttrDict):
+    '''Read-only AttrDict, as shared between callers by ``load_cached()``
+
+    Copies made with ``copy``, ``deepcopy`` or ``pickle`` are regular, mutable
+    ``AttrDict`` instances.
+    '''
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenAttrDict is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = move_to_end = _readonly
+
+    def copy(self):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (AttrDict, (), None, None, iter(AttrDict.items(self)))
+
+
+class FrozenList(list):
+    '''Read-only list, used for arrays in frozen configurations'''
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenList is read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def freeze(cfg):
+    '''Return a read-only copy of the loaded configuration ``cfg``
+
+    Groups become ``FrozenAttrDict`` and arrays ``FrozenList`` instances.
+    '''
+
+    if isinstance(cfg, dict):
+        frozen = FrozenAttrDict()
+        for key, value in cfg.items():
+            AttrDict.__setitem__(frozen, key, freeze(value))
+        return frozen
+    if isinstance(cfg, tuple):
+        return tuple(freeze(value) for value in cfg)
+    if isinstance(cfg, list):
+        return FrozenList(cfg)
+    return cfg
+
+
+def thaw(cfg):
+    '''Return a mutable copy of the loaded configuration ``cfg``
+
+    This is a cheaper alternative to ``copy.deepcopy()``: only groups and
+    arrays are copied, scalars and tuples without groups are shared.
+    '''
+
+    if isinstance(cfg, dict):
+        result = AttrDict()
+        for key, value in cfg.items():
+            result[key] = thaw(value)
+        return result
+    if isinstance(cfg, tuple):
+        values = tuple(thaw(value) for value in cfg)
+        if all(a is b for a, b in zip(values, cfg)):
+            return cfg
+        return values
+    if isinstance(cfg, list):
+        return list(cfg)
+    return cfg
+
+
+class ConfigCache(object):
+    '''LRU cache of parsed configuration files, see ``load_cached()``
+
+    At most ``maxsize`` files are kept, with a total size of the files and
+    their includes of at most ``maxbytes``. Least recently used entries are
+    evicted first.
+
+    Entries are validated on every lookup by checking modification time and
+    size of the file and of all files it includes. If ``hash_contents`` is
+    true, a hash of their contents is checked too, which catches changes that
+    keep both modification time and size intact.
+    '''
+
+    def __init__(self, maxsize=64, maxbytes=64 * 2**20, hash_contents=False):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hash_contents = hash_contents
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def load(self, path, includedir='', frozen=False):
+        '''Load ``path``, or return the cached result if it is up-to-date
+
+        If ``frozen`` is true, the shared cached object is returned, a
+        read-only ``FrozenAttrDict``. Otherwise, callers get their own
+        mutable copy.
+        '''
+
+        key = (os.path.abspath(path), includedir)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and self.is_fresh(entry):
+            with self.lock:
+                if key in self.entries:
+                    # Mark as most recently used.
+                    self.entries[key] = self.entries.pop(key)
+        else:
+            entry = self.parse(path, includedir)
+            with self.lock:
+                self.discard(key)
+                self.entries[key] = entry
+                self.nbytes += entry[1]
+                while self.entries and (len(self.entries) > self.maxsize or
+                                        self.nbytes > self.maxbytes):
+                    self.discard(next(iter(self.entries)))
+
+        result = entry[0]
+        return result if frozen else thaw(result)
+
+    def parse(self, path, includedir):
+        '''Parse a file, return a new cache entry for it'''
+        main_state = self.file_state(path)
+        includefiles = []
+        with io.open(path, 'r', encoding='utf-8') as f:
+            tokenstream = TokenStream.from_file(f, filename=path,
+                                                includedir=includedir,
+                                                includefiles=includefiles)
+            result = freeze(Parser(tokenstream).parse())
+
+        files = [(os.path.abspath(path), main_state)]
+        files.extend((os.path.abspath(name), self.file_state(name))
+                     for name in set(includefiles))
+        nbytes = sum(state[1] for name, state in files)
+        return (result, nbytes, files)
+
+    def is_fresh(self, entry):
+        '''Return True if no file of a cache entry was changed'''
+        return files_unchanged(entry[2], self.hash_contents)
+
+    def file_state(self, path):
+        '''Return a tuple describing the current state of file ``path``'''
+        return file_state(path, self.hash_contents)
+
+    def discard(self, key):
+        '''Remove an entry, if present. Must be called with the lock held.'''
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def clear(self):
+        '''Remove all entries from the cache'''
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+
+default_cache = ConfigCache()
+
+
+def load_cached(path, includedir='', frozen=False, cache=None):
+    '''Load the file at ``path``, reusing earlier results while it's unchanged
+
+    Results are kept in ``cache``, a ``ConfigCache`` instance, or a
+    process-wide default cache. An entry is reused as long as neither the
+    file nor any file it includes was modified.
+
+    If ``frozen`` is true, all callers share one read-only result object.
+    Otherwise, each call returns its own mutable copy, which is still much
+    cheaper than parsing the file again.
+    '''
+
+    if cache is None:
+        cache = default_cache
+    return cache.load(path, includedir=includedir, frozen=frozen)
+
+
+def _load_or_error(args):
+    '''Load one file for ``load_many()``, return the ConfigParseError if any
+
+    Runs in worker processes. The result travels back to the caller pickled,
+    which handles AttrDict and friends without any conversion.
+    '''
+
+    path, includedir = args
+    try:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return load(f, includedir=includedir)
+    except ConfigParseError as e:
+        return e
+
+
+def load_many(paths, includedir='', workers=None, threads=False):
+    '''Load many files in parallel, return a list of results
+
+    Files are parsed on a pool of ``workers`` processes, by default one per
+    CPU. With ``threads=True``, a thread pool is used instead, which only
+    helps if reading the files is the bottleneck.
+
+    The returned list is in the order of ``paths``. If a file can't be parsed,
+    its entry is the ``ConfigParseError`` instead of a result, so one broken
+    file doesn't hide the others. Other errors, such as missing files, are
+    raised.
+
+    Example:
+
+        >>> for path, c in zip(paths, libconf.load_many(paths)):
+        ...     if isinstance(c, libconf.ConfigParseError):
+        ...         print("%s: %s" % (path, c))
+    '''
+
+    import multiprocessing.pool
+
+    args = [(path, includedir) for path in paths]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1 or len(args) <= 1:
+        return [_load_or_error(arg) for arg in args]
+
+    pool_class = (multiprocessing.pool.ThreadPool if threads
+                  else multiprocessing.pool.Pool)
+    pool = pool_class(min(workers, len(args)))
+    try:
+        return pool.map(_load_or_error, args)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def read_file(path):
+    '''Return the contents of the file at ``path``, as ``load()`` reads it'''
+    with open(path) as f:
+        return f.read()
+
+
+def read_main_file(path):
+    '''Return the contents of the UTF-8 encoded file at ``path``'''
+    with io.open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class AsyncLoader(object):
+    '''Load a file and its includes without blocking an asyncio event loop
+
+    Used by ``aload()`` and ``aloads()``. Files are read on ``executor``. As
+    soon as a file has been read, all files it includes are requested at
+    once, so sibling includes are read concurrently. When all files are
+    available, the input is parsed on ``executor`` as well, and the result
+    (or exception) is passed on to ``future``.
+
+    All methods except ``parse()`` run on the event loop. ``options`` are
+    passed on to ``load()``.
+    '''
+
+    def __init__(self, filename, includedir='', parser=Parser, select=None,
+                 loop=None, executor=None, **options):
+        self.filename = filename
+        self.includedir = includedir
+        self.parser = parser
+        self.select = select
+        self.options = options
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self.executor = executor
+        self.future = asyncio.Future(loop=self.loop)
+        self.texts = {}  # File name -> contents, exception or None if pending
+        self.pending = 0
+
+    def start(self, text=None):
+        '''Start loading, reading the main file unless ``text`` is given'''
+        if text is None:
+            self.fetch(self.filename, read_main_file)
+        else:
+            self.add_text(self.filename, text)
+            self.check_done()
+        return self.future
+
+    def fetch(self, name, read=read_file):
+        '''Start reading file ``name`` on the executor'''
+        self.texts[name] = None
+        self.pending += 1
+        future = self.loop.run_in_executor(self.executor, read, name)
+        future.add_done_callback(lambda future: self.fetched(name, future))
+
+    def fetched(self, name, future):
+        self.pending -= 1
+        try:
+            text = future.result()
+        except Exception as e:
+            text = e
+        if self.future.done():
+            return
+
+        if isstr(text):
+            self.add_text(name, text)
+        elif name == self.filename:
+            self.future.set_exception(text)
+            return
+        else:
+            # load() reports unreadable include files when it gets to them.
+            self.texts[name] = text
+        self.check_done()
+
+    def add_text(self, name, text):
+        '''Store the contents of a file, request the files it includes'''
+        self.texts[name] = text
+        for m in INCLUDE_RE.finditer(text):
+            includefilename = os.path.join(self.includedir,
+                                           decode_escapes(m.group(1)))
+            if includefilename not in self.texts:
+                self.fetch(includefilename)
+
+    def check_done(self):
+        if self.pending:
+            return
+        future = self.loop.run_in_executor(self.executor, self.parse)
+        future.add_done_callback(self.parsed)
+
+    def parse(self):
+        '''Parse the main file, taking includes from ``texts``'''
+        include_cache = IncludeCache(check_files=False, opener=self.open,
+                                     stream_first=True)
+        return load(io.StringIO(self.texts[self.filename]),
+                    filename=self.filename, includedir=self.includedir,
+                    parser=self.parser, select=self.select,
+                    include_cache=include_cache, **self.options)
+
+    def open(self, name):
+        text = self.texts.get(name)
+        if not isstr(text):
+            raise IOError("Could not read %r: %s" % (name, text))
+        return io.StringIO(text)
+
+    def parsed(self, future):
+        if future.cancelled():
+            self.future.cancel()
+        elif future.exception() is not None:
+            if not self.future.done():
+                self.future.set_exception(future.exception())
+        elif not self.future.done():
+            self.future.set_result(future.result())
+
+
+def aload(path, includedir='', parser=Parser, select=None, loop=None,
+          executor=None, **options):
+    '''Load the file at ``path`` without blocking the asyncio event loop
+
+    Returns an ``asyncio.Future`` for the result of ``load()``. The file and
+    all files it includes are read on ``executor`` (by default, the event
+    loop's default executor), sibling includes concurrently. Parsing runs on
+    ``executor`` too. Further keyword arguments, e.g. ``typed_arrays``, are
+    passed on to ``load()``.
+
+    Example:
+
+        >>> config = await libconf.aload('example.cfg')
+    '''
+
+    if asyncio is None:
+        raise NotImplementedError("libconf.aload() requires asyncio")
+    loader = AsyncLoader(path, includedir=includedir, parser=parser,
+                         select=select, loop=loop, executor=executor,
+                         **options)
+    return loader.start()
+
+
+def aloads(string, filename=None, includedir='', parser=Parser, select=None,
+           loop=None, executor=None, **options):
+    '''Load ``string`` without blocking the asyncio event loop
+
+    Like ``aload()``, but the main input is given as a unicode string.
+    Returns an ``asyncio.Future`` for the result of ``loads()``.
+    '''
+
+    if asyncio is None:
+        raise NotImplementedError("libconf.aloads() requires asyncio")
+    if not isinstance(string, type(u'')):
+        raise TypeError("libconf.aloads() input string must by unicode")
+    loader = AsyncLoader(filename, includedir=includedir, parser=parser,
+                         select=select, loop=loop, executor=executor,
+                         **options)
+    return loader.start(string)
+
+
+class ConfigWatcher(object):
+    '''Reload a file when it or any file it includes changes, see ``watch()``
+
+    ``check()`` polls the modification time and size of all files read by
+    the last load (and, if ``hash_contents`` is true, a hash of their
+    contents). If any of them changed, it waits until they stay unchanged
+    for ``debounce`` seconds, so that a burst of writes causes only one
+    reload. After reloading, ``callback(changes, config)`` is called if the
+    result differs from the previous one, with ``changes`` as returned by
+    ``diff()``. If the file can't be loaded, ``error_callback`` is called
+    with the exception, and the previous result is kept.
+
+    ``start()`` runs ``check()`` every ``interval`` seconds on a daemon
+    thread, until ``stop()`` is called. Exceptions raised there, e.g. by
+    ``callback``, are passed to ``error_callback`` (or printed if it is
+    None) and don't stop the polling.
+    '''
+
+    def __init__(self, path, callback, includedir='', interval=1.0,
+                 debounce=0.2, error_callback=None, hash_contents=False,
+                 parser=Parser, **options):
+        self.path = path
+        self.callback = callback
+        self.includedir = includedir
+        self.interval = interval
+        self.debounce = debounce
+        self.error_callback = error_callback
+        self.hash_contents = hash_contents
+        self.parser = parser
+        self.options = options
+        self.files = []
+        self.stopped = threading.Event()
+        self.thread = None
+        self.config = self.load()
+
+    def load(self):
+        '''Load the file, recording the state of all files read'''
+        main_state = self.file_state(self.path)
+        includefiles = []
+        try:
+            with io.open(self.path, 'r', encoding='utf-8') as f:
+                tokenstream = TokenStream.from_file(f, filename=self.path,
+                                                    includedir=self.includedir,
+                                                    includefiles=includefiles)
+                return self.parser(tokenstream, **self.options).parse()
+        finally:
+            # Includes read before an error are watched too.
+            self.files = [(self.path, main_state)]
+            self.files.extend((name, self.file_state(name))
+                              for name in sorted(set(includefiles)))
+
+    def file_state(self, path):
+        '''Return ``file_state(path)``, or None if the file is inaccessible'''
+        try:
+            return file_state(path, self.hash_contents)
+        except (IOError, OSError):
+            return None
+
+    def current_states(self):
+        return [self.file_state(path) for path, state in self.files]
+
+    def check(self):
+        '''Reload the file if it or any file it includes changed
+
+        Return True if the file was loaded again.
+        '''
+
+        states = self.current_states()
+        if states == [state for path, state in self.files]:
+            return False
+
+        while True:
+            if self.stopped.wait(self.debounce):
+                return False
+            newer = self.current_states()
+            if newer == states:
+                break
+            states = newer
+
+        old = self.config
+        try:
+            self.config = self.load()
+        except (ConfigParseError, ValueError, RuntimeError, IOError,
+                OSError) as e:
+            # RuntimeError covers RecursionError from very deep input.
+            if self.error_callback is not None:
+                self.error_callback(e)
+            return True
+
+        changes = diff(old, self.config)
+        if changes:
+            self.callback(changes, self.config)
+        return True
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            # Keep polling if the callback fails.
+            try:
+                self.check()
+            except Exception as e:
+                if self.error_callback is not None:
+                    self.error_callback(e)
+                else:
+                    traceback.print_exc()
+
+    def start(self):
+        '''Start polling on a daemon thread, return ``self``'''
+        self.thread = threading.Thread(target=self.run,
+                                       name='libconf.watch(%r)' % (self.path,))
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        '''Stop polling, wait for the polling thread to finish'''
+        self.stopped.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+def watch(path, callback, includedir='', interval=1.0, debounce=0.2,
+          error_callback=None, hash_contents=False, parser=Parser,
+          **options):
+    '''Load the file at ``path`` and watch it for changes
+
+    The file and all files it includes are polled every ``interval``
+    seconds. When they change, the file is loaded again and
+    ``callback(changes, config)`` is called with the new result and the
+    list of ``Change`` tuples returned by ``diff()``. See ``ConfigWatcher``
+    for details.
+
+    Returns the running ``ConfigWatcher``; its ``config`` attribute holds
+    the current result. Call its ``stop()`` method to stop watching.
+    Further keyword arguments, e.g. ``typed_arrays``, are passed to the
+    parser.
+
+    Example:
+
+        >>> def reloaded(changes, config):
+        ...     for kind, path, old, new in changes:
+        ...         print(kind, '.'.join(map(str, path)), old, new)
+        >>> watcher = libconf.watch('example.cfg', reloaded)
+    '''
+
+    return ConfigWatcher(path, callback, includedir=includedir,
+                         interval=interval, debounce=debounce,
+                         error_callback=error_callback,
+                         hash_contents=hash_contents, parser=parser,
+                         **options).start()
+
+
+# dump() logic
+##############
+
+class LibconfList(tuple):
+    pass
+
+
+class LibconfArray(list):
     pass
 
 
@@ -530,6 +2638,31 @@ class LibconfInt64(LONGTYPE):
     pass
 
 
+class LibconfListStream(object):
+    '''Wrap an iterable to dump its elements as a libconfig list
+
+    Elements are written as they are produced, so generators can be dumped
+    without building the whole list in memory. The iterable is consumed by
+    ``dump()``; generators can only be dumped once.
+    '''
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+
+class LibconfArrayStream(LibconfListStream):
+    '''Wrap an iterable to dump its elements as a libconfig array
+
+    Like ``LibconfListStream``, but element types are checked as they are
+    produced. As earlier elements are already written, an int64 value
+    following 32-bit integers raises ``ConfigSerializeError``; to get an
+    int64 array, make the first element a ``LibconfInt64``.
+    '''
+
+
 def is_long_int(i):
     '''Return True if argument should be dumped as int64 type
 
@@ -554,15 +2687,18 @@ def dump_string(s):
     The returned string will be surrounded by double quotes.
     '''
 
+    if not DUMP_ESCAPE_RE.search(s):
+        return '"' + s + '"'  # Nothing to escape, the common case.
     s = (s.replace('\\', '\\\\')
           .replace('"', '\\"')
           .replace('\f', r'\f')
           .replace('\n', r'\n')
           .replace('\r', r'\r')
           .replace('\t', r'\t'))
-    s = UNPRINTABLE_CHARACTER_RE.sub(
-            lambda m: r'\x{:02x}'.format(ord(m.group(0))),
-            s)
+    if UNPRINTABLE_CHARACTER_RE.search(s):
+        s = UNPRINTABLE_CHARACTER_RE.sub(
+                lambda m: r'\x{:02x}'.format(ord(m.group(0))),
+                s)
     return '"' + s + '"'
 
 
@@ -574,7 +2710,7 @@ def get_dump_type(value):
     ``'f'`` (float), or ``'s'`` (string).
 
     Produces the proper type for LibconfList, LibconfArray, LibconfInt64
-    instances.
+    instances. ``array.array`` and NumPy arrays are arrays, too.
     '''
 
     if isinstance(value, dict):
@@ -583,6 +2719,8 @@ def get_dump_type(value):
         return 'l'
     if isinstance(value, list):
         return 'a'
+    if isinstance(value, LibconfListStream):
+        return 'a' if isinstance(value, LibconfArrayStream) else 'l'
 
     # Test bool before int since isinstance(True, int) == True.
     if isinstance(value, bool):
@@ -597,9 +2735,61 @@ def get_dump_type(value):
     if isstr(value):
         return 's'
 
+    # After the scalar types, as NumPy scalars like numpy.float64 subclass
+    # them and look like arrays.
+    if is_typed_array(value):
+        return 'a'
+
     return None
 
 
+def is_typed_array(value):
+    '''Return True for ``array.array`` and NumPy array instances
+
+    NumPy arrays are recognized by their ``dtype`` and ``tolist``
+    attributes, so NumPy doesn't need to be imported. NumPy scalars have
+    these attributes too, but ``ndim`` 0.
+    '''
+
+    return (isinstance(value, array.array) or
+            (hasattr(value, 'dtype') and hasattr(value, 'tolist') and
+             getattr(value, 'ndim', 1) != 0))
+
+
+def get_typed_array_values(value):
+    '''Return the elements and the value type of a typed array
+
+    ``value`` is an ``array.array`` or NumPy array. Elements of integer and
+    float arrays are converted and checked in bulk; arrays with typecode
+    ``'q'`` or ``'Q'`` are always int64 arrays. Other arrays are checked by
+    ``get_array_value_dtype()``.
+    '''
+
+    if isinstance(value, array.array):
+        kind = {'f': 'f', 'd': 'f', 'u': 'U', 'w': 'U'}.get(
+            value.typecode, 'i')
+        int64 = value.typecode in 'qQ'
+    else:
+        if getattr(value, 'ndim', 1) != 1:
+            raise ConfigSerializeError(
+                "Arrays must be one-dimensional: %r of type %s" %
+                (value, type(value)))
+        kind = value.dtype.kind
+        int64 = False
+
+    values = value.tolist()
+    if not values:
+        return values, None
+    if kind in 'iu':
+        if (int64 or min(values) < SMALL_INT_MIN or
+                max(values) > SMALL_INT_MAX):
+            return values, 'i64'
+        return values, 'i'
+    if kind == 'f':
+        return values, 'f'
+    return values, get_array_value_dtype(values)
+
+
 def get_array_value_dtype(lst):
     '''Return array value type, raise ConfigSerializeError for invalid arrays
 
@@ -613,97 +2803,233 @@ def get_array_value_dtype(lst):
 
     array_value_type = None
     for value in lst:
-        dtype = get_dump_type(value)
-        if dtype not in {'b', 'i', 'i64', 'f', 's'}:
-            raise ConfigSerializeError(
-                "Invalid datatype in array (may only contain scalars):"
-                "%r of type %s" % (value, type(value)))
-
-        if array_value_type is None:
-            array_value_type = dtype
-            continue
+        array_value_type = get_array_value_dtype_step(array_value_type, value)
+    return array_value_type
 
-        if array_value_type == dtype:
-            continue
 
-        if array_value_type == 'i' and dtype == 'i64':
-            array_value_type = 'i64'
-            continue
+def get_array_value_dtype_step(array_value_type, value):
+    '''Return the array value type after adding ``value`` to an array
 
-        if array_value_type == 'i64' and dtype == 'i':
-            continue
+    ``array_value_type`` is the type of the earlier elements, or None if
+    there were none. Raises ConfigSerializeError if ``value`` doesn't fit.
+    '''
 
+    dtype = get_dump_type(value)
+    if dtype not in {'b', 'i', 'i64', 'f', 's'}:
         raise ConfigSerializeError(
-            "Mixed types in array (all elements must have same type):"
+            "Invalid datatype in array (may only contain scalars):"
             "%r of type %s" % (value, type(value)))
 
-    return array_value_type
+    if array_value_type is None or array_value_type == dtype:
+        return dtype
 
+    if array_value_type == 'i' and dtype == 'i64':
+        return 'i64'
 
-def dump_value(key, value, f, indent=0):
-    '''Save a value of any libconfig type
+    if array_value_type == 'i64' and dtype == 'i':
+        return 'i64'
 
-    This function serializes takes ``key`` and ``value`` and serializes them
-    into ``f``. If ``key`` is ``None``, a list-style output is produced.
-    Otherwise, output has ``key = value`` format.
+    raise ConfigSerializeError(
+        "Mixed types in array (all elements must have same type):"
+        "%r of type %s" % (value, type(value)))
+
+
+class FragmentBuffer(list):
+    '''List of output fragments for the dump engine
+
+    If a file ``f`` is given, ``append_dict()`` and friends regularly write
+    the collected fragments to it, once there are more than ``batch_size``.
+    Otherwise, all fragments are kept until they are joined by the caller.
     '''
 
-    spaces = ' ' * indent
+    batch_size = 4096
 
-    if key is None:
-        key_prefix = ''
-        key_prefix_nl = ''
-    else:
-        key_prefix = key + ' = '
-        key_prefix_nl = key + ' =\n' + spaces
+    def __init__(self, f=None):
+        super(FragmentBuffer, self).__init__()
+        self.f = f
+        self.limit = self.batch_size if f is not None else sys.maxsize
+
+    def flush(self):
+        '''Write all fragments collected so far to ``f``'''
+        if self:
+            self.f.write(u''.join(self))
+            del self[:]
+
+
+INDENT_STRINGS = {}
+
+
+def indent_string(indent):
+    '''Return a string of ``indent`` spaces, reusing earlier instances'''
+    try:
+        return INDENT_STRINGS[indent]
+    except KeyError:
+        return INDENT_STRINGS.setdefault(indent, ' ' * indent)
+
+
+# Stringize scalars of the given libconfig type, cf. get_dump_type().
+SCALAR_DUMPERS = {
+    's': dump_string,
+    'i': str,
+    'i64': lambda i: str(i) + 'L',
+    'f': format,
+    'b': format,
+}
+
+
+def append_value(key, value, out, indent=0):
+    '''Append the fragments of a value of any libconfig type to ``out``
+
+    This is the core of the dump engine: instead of writing to a file, all
+    output is appended as string fragments to ``out``, a ``FragmentBuffer``,
+    which joins them once at the end or in batches. ``key`` is handled as in
+    ``dump_value()``.
+    '''
+
+    spaces = indent_string(indent)
 
     dtype = get_dump_type(value)
+    if dtype in SCALAR_DUMPERS:
+        text = SCALAR_DUMPERS[dtype](value)
+        if key is None:
+            out.append(spaces + text)
+        else:
+            out.append(spaces + key + ' = ' + text)
+        return
+
     if dtype == 'd':
-        f.write(u'{}{}{{\n'.format(spaces, key_prefix_nl))
-        dump_dict(value, f, indent + 4)
-        f.write(u'{}}}'.format(spaces))
+        opening, closing = '{\n', spaces + '}'
     elif dtype == 'l':
-        f.write(u'{}{}(\n'.format(spaces, key_prefix_nl))
-        dump_collection(value, f, indent + 4)
-        f.write(u'\n{})'.format(spaces))
+        opening, closing = '(\n', '\n' + spaces + ')'
     elif dtype == 'a':
-        f.write(u'{}{}[\n'.format(spaces, key_prefix_nl))
-        value_dtype = get_array_value_dtype(value)
-
-        # If int array contains one or more Int64, promote all values to i64.
-        if value_dtype == 'i64':
-            value = [LibconfInt64(v) for v in value]
-        dump_collection(value, f, indent + 4)
-        f.write(u'\n{}]'.format(spaces))
-    elif dtype == 's':
-        f.write(u'{}{}{}'.format(spaces, key_prefix, dump_string(value)))
-    elif dtype == 'i' or dtype == 'i64':
-        f.write(u'{}{}{}'.format(spaces, key_prefix, dump_int(value)))
-    elif dtype == 'f' or dtype == 'b':
-        f.write(u'{}{}{}'.format(spaces, key_prefix, value))
+        opening, closing = '[\n', '\n' + spaces + ']'
     else:
         raise ConfigSerializeError("Can not serialize object %r of type %s" %
                                    (value, type(value)))
 
+    if key is None:
+        out.append(spaces + opening)
+    else:
+        out.append(spaces + key + ' =\n' + spaces + opening)
 
-def dump_collection(cfg, f, indent=0):
-    '''Save a collection of attributes'''
+    if dtype == 'd':
+        append_dict(value, out, indent + 4)
+    elif dtype == 'l':
+        append_collection(value, out, indent + 4)
+    else:
+        append_array(value, out, indent + 4)
+    out.append(closing)
+
+
+def append_collection(cfg, out, indent=0):
+    '''Append the fragments of a collection of values to ``out``'''
 
     for i, value in enumerate(cfg):
-        dump_value(None, value, f, indent)
-        if i < len(cfg) - 1:
-            f.write(u',\n')
+        if i:
+            out.append(',\n')
+            if len(out) > out.limit:
+                out.flush()
+        append_value(None, value, out, indent)
 
 
-def dump_dict(cfg, f, indent=0):
-    '''Save a dictionary of attributes'''
+def append_array(cfg, out, indent=0):
+    '''Append the fragments of an array to ``out``
+
+    All elements have the same type, so they are stringized in bulk.
+    '''
+
+    if isinstance(cfg, LibconfArrayStream):
+        return append_array_stream(cfg, out, indent)
+
+    # If int array contains one or more Int64, the 'i64' type makes sure
+    # that all values are promoted to i64.
+    if is_typed_array(cfg):
+        cfg, value_dtype = get_typed_array_values(cfg)
+    else:
+        value_dtype = get_array_value_dtype(cfg)
+    if value_dtype is None:
+        return
+
+    to_string = SCALAR_DUMPERS[value_dtype]
+    separator = ',\n' + indent_string(indent)
+    out.append(indent_string(indent))
+    out.append(separator.join(map(to_string, cfg)))
+
+
+def append_array_stream(cfg, out, indent=0):
+    '''Append the fragments of a ``LibconfArrayStream`` to ``out``
+
+    Element types are checked as the elements are produced. They are
+    stringized and, if ``out`` has a file, written in batches of
+    ``out.batch_size`` elements.
+    '''
+
+    separator = ',\n' + indent_string(indent)
+    prefix = indent_string(indent)
+    value_dtype = None
+    batch = []
+    for value in cfg:
+        dtype = get_array_value_dtype_step(value_dtype, value)
+        if dtype != value_dtype:
+            if value_dtype is not None:
+                raise ConfigSerializeError(
+                    "Int64 value in array after 32-bit integers were "
+                    "written: %r of type %s" % (value, type(value)))
+            value_dtype = dtype
+            to_string = SCALAR_DUMPERS[dtype]
+
+        batch.append(to_string(value))
+        if len(batch) >= out.batch_size:
+            out.append(prefix + separator.join(batch))
+            prefix = separator
+            batch = []
+            if out.f is not None:
+                out.flush()
+
+    if batch:
+        out.append(prefix + separator.join(batch))
+
+
+def append_dict(cfg, out, indent=0):
+    '''Append the fragments of a dictionary of attributes to ``out``'''
 
     for key in cfg:
         if not isstr(key):
             raise ConfigSerializeError("Dict keys must be strings: %r" %
                                        (key,))
-        dump_value(key, cfg[key], f, indent)
-        f.write(u';\n')
+        append_value(key, cfg[key], out, indent)
+        out.append(';\n')
+        if len(out) > out.limit:
+            out.flush()
+
+
+def dump_value(key, value, f, indent=0):
+    '''Save a value of any libconfig type
+
+    This function serializes takes ``key`` and ``value`` and serializes them
+    into ``f``. If ``key`` is ``None``, a list-style output is produced.
+    Otherwise, output has ``key = value`` format.
+    '''
+
+    out = FragmentBuffer(f)
+    append_value(key, value, out, indent)
+    out.flush()
+
+
+def dump_collection(cfg, f, indent=0):
+    '''Save a collection of attributes'''
+
+    out = FragmentBuffer(f)
+    append_collection(cfg, out, indent)
+    out.flush()
+
+
+def dump_dict(cfg, f, indent=0):
+    '''Save a dictionary of attributes'''
+
+    out = FragmentBuffer(f)
+    append_dict(cfg, out, indent)
+    out.flush()
 
 
 def dumps(cfg):
@@ -715,9 +3041,14 @@ def dumps(cfg):
     Returns the formatted string.
     '''
 
-    str_file = io.StringIO()
-    dump(cfg, str_file)
-    return str_file.getvalue()
+    if not isinstance(cfg, dict):
+        raise ConfigSerializeError(
+                'dump() requires a dict as input, not %r of type %r' %
+                (cfg, type(cfg)))
+
+    out = FragmentBuffer()
+    append_dict(cfg, out, 0)
+    return u''.join(out)
 
 
 def dump(cfg, f):
@@ -726,7 +3057,13 @@ def dump(cfg, f):
     ``cfg`` must be a ``dict`` with ``str`` keys and libconf-supported values
     (numbers, strings, booleans, possibly nested dicts, lists, and tuples).
 
-    ``f`` must be a ``file``-like object with a ``write()`` method.
+    ``f`` must be a ``file``-like object with a ``write()`` method. Output
+    is written in batches as it is produced.
+
+    Lists and arrays can also be given as ``LibconfListStream`` and
+    ``LibconfArrayStream`` wrappers around iterables, such as generators.
+    Their elements are dumped as they are produced, without keeping them in
+    memory.
     '''
 
     if not isinstance(cfg, dict):
@@ -734,7 +3071,271 @@ def dump(cfg, f):
                 'dump() requires a dict as input, not %r of type %r' %
                 (cfg, type(cfg)))
 
-    dump_dict(cfg, f, 0)
+    out = FragmentBuffer(f)
+    append_dict(cfg, out, 0)
+    out.flush()
+
+
+# diff() and patch() logic
+##########################
+
+class Change(collections.namedtuple('Change', 'kind path old new')):
+    '''One difference between two configurations, see ``diff()``'''
+    __slots__ = ()
+
+
+# Types compared with == alone by diff(), if both values have the same one.
+DIFF_SCALAR_TYPES = frozenset([bool, int, LONGTYPE, LibconfInt64, float, str,
+                               type(u'')])
+INT_KINDS = ('i', 'i64')
+
+
+def diff(a, b):
+    '''Return a list of the differences between two configurations
+
+    Each difference is a ``Change(kind, path, old, new)`` tuple. ``path`` is
+    the tuple of setting names (and list or array indices) leading to the
+    value, ``old`` and ``new`` are the values in ``a`` and ``b``. ``kind``
+    is one of
+
+    * ``'added'``: a setting exists in ``b`` only; ``old`` is None.
+    * ``'removed'``: a setting exists in ``a`` only; ``new`` is None.
+    * ``'changed'``: the value is different.
+    * ``'type'``: the value is equal, but is an int in one configuration and
+      an int64 in the other, or a list in one and an array in the other.
+      For typed arrays, int64 applies to the whole array, so this is
+      reported for the array rather than for its elements.
+
+    Groups are compared setting by setting, lists and arrays of equal length
+    element by element; lists and arrays whose length changed are reported
+    as a whole. Values that are the same object in ``a`` and ``b`` are
+    skipped without looking at them, so comparing configurations that share
+    unchanged parts, like the result of ``patch()``, takes time proportional
+    to the changes.
+
+    Example:
+
+        >>> libconf.diff(libconf.loads(u'a = 1; b = [1];'),
+        ...              libconf.loads(u'a = 2; b = (1,); c = "x";'))
+        [Change(kind='changed', path=('a',), old=1, new=2),
+         Change(kind='type', path=('b',), old=[1], new=(1,)),
+         Change(kind='added', path=('c',), old=None, new='x')]
+    '''
+
+    changes = []
+    _diff_value(a, b, (), changes)
+    return changes
+
+
+def _diff_value(old, new, path, changes):
+    if old is new:
+        return
+    old_type = type(old)
+    if old_type is type(new):
+        if old_type in DIFF_SCALAR_TYPES:
+            if old != new:
+                changes.append(Change('changed', path, old, new))
+            return
+        if isinstance(old, dict):
+            return _diff_group(old, new, path, changes)
+        if isinstance(old, tuple):
+            return _diff_sequence(old, new, 'l', 'l', path, changes)
+        if isinstance(old, list):
+            return _diff_sequence(old, new, 'a', 'a', path, changes)
+
+    old_kind = get_dump_type(old)
+    new_kind = get_dump_type(new)
+    if old_kind == 'd' and new_kind == 'd':
+        _diff_group(old, new, path, changes)
+    elif old_kind in ('l', 'a') and new_kind in ('l', 'a'):
+        _diff_sequence(old, new, old_kind, new_kind, path, changes)
+    elif old_kind == new_kind and old_kind is not None:
+        if old != new:
+            changes.append(Change('changed', path, old, new))
+    elif old_kind in INT_KINDS and new_kind in INT_KINDS and old == new:
+        changes.append(Change('type', path, old, new))
+    elif old_kind != new_kind or old_type is not type(new) or old != new:
+        changes.append(Change('changed', path, old, new))
+
+
+def _diff_group(old, new, path, changes):
+    start = len(changes)
+    missing = changes  # Marker object, never a setting value.
+    common = 0
+    for name, value in new.items():
+        other = old.get(name, missing)
+        if other is missing:
+            changes.append(Change('added', path + (name,), None, value))
+            continue
+
+        common += 1
+        if other is value:
+            continue
+        value_type = type(value)
+        if value_type is type(other) and value_type in DIFF_SCALAR_TYPES:
+            if other != value:
+                changes.append(Change('changed', path + (name,), other,
+                                      value))
+        else:
+            _diff_value(other, value, path + (name,), changes)
+
+    if common != len(old):
+        changes[start:start] = [Change('removed', path + (name,), value, None)
+                                for name, value in old.items()
+                                if name not in new]
+
+
+def _diff_sequence(old, new, old_kind, new_kind, path, changes):
+    if is_typed_array(old) or is_typed_array(new):
+        return _diff_typed_array(old, new, old_kind, new_kind, path, changes)
+
+    if len(old) != len(new):
+        changes.append(Change('changed', path, old, new))
+        return
+
+    if old_kind != new_kind:
+        element_changes = []
+        for index, (a, b) in enumerate(zip(old, new)):
+            _diff_value(a, b, path + (index,), element_changes)
+        kind = 'changed' if element_changes else 'type'
+        changes.append(Change(kind, path, old, new))
+        return
+
+    types = list(map(type, old))
+    if old == new and types == list(map(type, new)):
+        # Only the contents of groups and lists within can still differ.
+        for index, value_type in enumerate(types):
+            if value_type not in DIFF_SCALAR_TYPES:
+                _diff_value(old[index], new[index], path + (index,), changes)
+        return
+
+    for index, (a, b) in enumerate(zip(old, new)):
+        if a is not b:
+            _diff_value(a, b, path + (index,), changes)
+
+
+def _diff_typed_array(old, new, old_kind, new_kind, path, changes):
+    '''Compare two sequences, at least one of which is a typed array
+
+    Whether integers are int64 is a property of the whole typed array (its
+    typecode), so elements are compared as plain values and the array value
+    types separately. A difference in the latter is reported as one change
+    of the whole array.
+    '''
+
+    old_values, old_type = _array_values(old)
+    new_values, new_type = _array_values(new)
+    if len(old_values) != len(new_values):
+        changes.append(Change('changed', path, old, new))
+        return
+
+    same_type = old_kind == new_kind and old_type == new_type
+    if same_type and old_values == new_values:
+        return  # Typed arrays only hold scalars, compared in bulk here.
+
+    element_changes = []
+    for index, (a, b) in enumerate(zip(old_values, new_values)):
+        _diff_value(a, b, path + (index,), element_changes)
+    if same_type:
+        changes.extend(element_changes)
+    elif element_changes:
+        changes.append(Change('changed', path, old, new))
+    else:
+        changes.append(Change('type', path, old, new))
+
+
+def _array_values(value):
+    '''Return the elements of a sequence without int64 marks, and its type
+
+    The type is the array value type of ``get_typed_array_values()``, or
+    None for an empty or invalid array.
+    '''
+
+    if is_typed_array(value):
+        return get_typed_array_values(value)
+    try:
+        value_type = get_array_value_dtype(value)
+    except ConfigSerializeError:
+        value_type = None
+    return [int(v) if isinstance(v, LibconfInt64) else v
+            for v in value], value_type
+
+
+def patch(cfg, changes):
+    '''Return a copy of ``cfg`` with ``changes`` applied
+
+    ``changes`` is a list of ``Change`` tuples, as returned by ``diff()``.
+    ``cfg`` itself is not modified: groups, lists and arrays on the paths of
+    changes are copied, all other values are shared with ``cfg``. Added
+    settings are appended to their group. Copies keep the type of the
+    original, except that ``FrozenAttrDict`` groups become ``AttrDict``.
+
+    ``patch(a, diff(a, b))`` is equal to ``b``, apart from the order of
+    added settings.
+
+    Raises ``KeyError`` or ``IndexError`` if a path doesn't exist in ``cfg``,
+    and ``ValueError`` if ``changes`` has both a change of a value and of
+    something within it.
+    '''
+
+    edits = {}
+    for change in changes:
+        path = change[1]
+        if not path:
+            if len(changes) != 1:
+                raise ValueError("Conflicting changes at path ()")
+            return change[3]
+
+        node = edits
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if not isinstance(node, dict):
+                raise ValueError("Conflicting changes at path %r" % (path,))
+        if path[-1] in node:
+            raise ValueError("Conflicting changes at path %r" % (path,))
+        node[path[-1]] = change
+
+    return _patch_value(cfg, edits)
+
+
+def _patch_value(value, edits):
+    '''Return a copy of ``value`` with the edits of ``patch()`` applied
+
+    ``edits`` maps setting names or indices to either a ``Change`` or, for
+    changes further down, the ``edits`` for that value.
+    '''
+
+    if isinstance(value, dict):
+        if isinstance(value, FrozenAttrDict):
+            result = AttrDict(AttrDict.items(value))
+        else:
+            result = type(value)(value)
+        for name, edit in edits.items():
+            if isinstance(edit, dict):
+                result[name] = _patch_value(value[name], edit)
+            elif edit[0] == 'removed':
+                del result[name]
+            else:
+                result[name] = edit[3]
+        return result
+
+    if isinstance(value, tuple):
+        result = list(value)
+    elif is_typed_array(value):
+        result = copy.copy(value)
+    else:
+        result = type(value)(value)
+    for index, edit in edits.items():
+        if isinstance(edit, dict):
+            result[index] = _patch_value(value[index], edit)
+        elif edit[0] == 'removed':
+            raise ValueError("Can't remove element %r of a list or array" %
+                             (index,))
+        else:
+            result[index] = edit[3]
+    if isinstance(value, tuple):
+        return type(value)(result)
+    return result
 
 
 # main(): small example of how to use libconf
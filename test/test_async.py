@@ -0,0 +1,86 @@
+import io
+import os
+import pytest
+
+import libconf
+
+asyncio = pytest.importorskip('asyncio')
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+# Helper functions
+##################
+
+def run(make_future):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(make_future(loop))
+    finally:
+        loop.close()
+
+def write(path, text):
+    with io.open(str(path), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+# Tests for aload() and aloads()
+################################
+
+def test_aload_matches_load():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+
+    c = run(lambda loop: libconf.aload(example_file, includedir=CURDIR,
+                                       loop=loop))
+    assert c == expected
+    assert isinstance(c.appconfig, libconf.AttrDict)
+
+def test_aload_reads_nested_and_repeated_includes(tmp_path):
+    write(tmp_path / 'main.cfg', u'@include "a.cfg"\nb = {\n@include "b.cfg"\n};')
+    write(tmp_path / 'a.cfg', u'a = 1;\n@include "c.cfg"\n')
+    write(tmp_path / 'b.cfg', u'@include "c.cfg"\n')
+    write(tmp_path / 'c.cfg', u'c = 3;')
+
+    c = run(lambda loop: libconf.aload(str(tmp_path / 'main.cfg'),
+                                       includedir=str(tmp_path), loop=loop))
+    assert c == {'a': 1, 'c': 3, 'b': {'c': 3}}
+
+def test_aloads_with_select():
+    c = run(lambda loop: libconf.aloads(u'a = 1; b = { c = 2; };',
+                                        select=['b.c'], loop=loop))
+    assert c == {'b': {'c': 2}}
+
+def test_aloads_passes_options_to_load():
+    text = u'a = [1, 2]; b = ({ c = 3; },);'
+    options = dict(typed_arrays=True, dict_factory=libconf.SlimAttrDict,
+                   list_factory=list, intern_names=True)
+    c = run(lambda loop: libconf.aloads(text, loop=loop, **options))
+    assert c == libconf.loads(text, **options)
+    assert type(c) is libconf.SlimAttrDict
+    assert c.a.typecode == 'i' and c.b == [{'c': 3}]
+
+def test_aload_missing_file_raises(tmp_path):
+    with pytest.raises((IOError, OSError)):
+        run(lambda loop: libconf.aload(str(tmp_path / 'missing.cfg'),
+                                       loop=loop))
+
+def test_aloads_missing_include_raises():
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        run(lambda loop: libconf.aloads(
+            u'a = 1;\n@include "/NON_EXISTING_FILE/DOESNT_EXIST"\n',
+            loop=loop))
+    assert 'Could not open include file' in str(excinfo.value)
+
+def test_aload_circular_include_raises():
+    circular_file = os.path.join(CURDIR, 'circular1.cfg')
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        run(lambda loop: libconf.aload(circular_file, includedir=CURDIR,
+                                       loop=loop))
+    assert 'Circular include' in str(excinfo.value)
+
+def test_aloads_parse_error_raises():
+    with pytest.raises(libconf.ConfigParseError):
+        run(lambda loop: libconf.aloads(u'a = ;', loop=loop))
@@ -0,0 +1,309 @@
+import collections
+import copy
+import functools
+import io
+import os
+import pickle
+import pytest
+import threading
+
+import libconf
+
+
+# Helper functions
+##################
+
+def write(path, text, mtime=None):
+    with io.open(str(path), 'w', encoding='utf-8') as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+# Tests for freeze() and thaw()
+###############################
+
+def test_freeze_makes_read_only_copy():
+    c = libconf.loads(u'a = { b = [1, 2]; c = ({ d = 1; },); };')
+    frozen = libconf.freeze(c)
+
+    assert frozen == c
+    assert isinstance(frozen.a, libconf.FrozenAttrDict)
+    assert isinstance(frozen.a.c[0], libconf.FrozenAttrDict)
+    with pytest.raises(TypeError):
+        frozen['x'] = 1
+    with pytest.raises(TypeError):
+        del frozen.a['b']
+    with pytest.raises(TypeError):
+        frozen.a.c[0].update(d=2)
+    with pytest.raises(TypeError):
+        frozen.a.b.append(3)
+
+def test_thaw_makes_mutable_copy():
+    c = libconf.loads(u'a = { b = [1, 2]; c = ({ d = 1; }, (1, 2)); };')
+    thawed = libconf.thaw(libconf.freeze(c))
+
+    assert thawed == c
+    assert type(thawed.a) is libconf.AttrDict
+    assert type(thawed.a.b) is list
+    thawed.a.b.append(3)
+    thawed.a.c[0].d = 2
+
+def test_copies_of_frozen_configs_are_mutable():
+    frozen = libconf.freeze(libconf.loads(u'a = { b = [1, 2]; };'))
+
+    for c in [copy.deepcopy(frozen), pickle.loads(pickle.dumps(frozen)),
+              frozen.copy()]:
+        assert c == frozen
+        c.a.b.append(3)
+        c['x'] = 1
+
+
+# Tests for load_cached()
+#########################
+
+def test_load_cached_reuses_result(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;')
+    cache = libconf.ConfigCache()
+
+    c1 = libconf.load_cached(str(path), frozen=True, cache=cache)
+    c2 = libconf.load_cached(str(path), frozen=True, cache=cache)
+    c3 = libconf.load_cached(str(path), cache=cache)
+
+    assert c1 == {'a': 1}
+    assert c1 is c2
+    assert c3 == c1 and c3 is not c1
+    c3['b'] = 2
+
+def test_load_cached_reloads_changed_file(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;', mtime=1000000)
+    cache = libconf.ConfigCache()
+    assert libconf.load_cached(str(path), cache=cache) == {'a': 1}
+
+    write(path, u'a = 2;', mtime=2000000)
+    assert libconf.load_cached(str(path), cache=cache) == {'a': 2}
+
+def test_load_cached_reloads_changed_include(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;\n@include "inc1.cfg"\n')
+    write(tmp_path / 'inc1.cfg', u'@include "inc2.cfg"\n')
+    write(tmp_path / 'inc2.cfg', u'b = 1;', mtime=1000000)
+    cache = libconf.ConfigCache()
+    c = libconf.load_cached(str(path), includedir=str(tmp_path), cache=cache)
+    assert c == {'a': 1, 'b': 1}
+
+    write(tmp_path / 'inc2.cfg', u'b = 2;', mtime=2000000)
+    c = libconf.load_cached(str(path), includedir=str(tmp_path), cache=cache)
+    assert c == {'a': 1, 'b': 2}
+
+def test_load_cached_hash_contents(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;', mtime=1000000)
+    cache = libconf.ConfigCache()
+    hash_cache = libconf.ConfigCache(hash_contents=True)
+    libconf.load_cached(str(path), cache=cache)
+    libconf.load_cached(str(path), cache=hash_cache)
+
+    # Same size and modification time, only detected by hashing.
+    write(path, u'a = 2;', mtime=1000000)
+    assert libconf.load_cached(str(path), cache=cache) == {'a': 1}
+    assert libconf.load_cached(str(path), cache=hash_cache) == {'a': 2}
+
+def test_load_cached_evicts_least_recently_used(tmp_path):
+    cache = libconf.ConfigCache(maxsize=2)
+    paths = [str(tmp_path / ('%d.cfg' % i)) for i in range(3)]
+    for i, path in enumerate(paths):
+        write(path, u'a = %d;' % i)
+
+    c0 = libconf.load_cached(paths[0], frozen=True, cache=cache)
+    libconf.load_cached(paths[1], frozen=True, cache=cache)
+    assert libconf.load_cached(paths[0], frozen=True, cache=cache) is c0
+    libconf.load_cached(paths[2], frozen=True, cache=cache)
+
+    assert len(cache.entries) == 2
+    assert libconf.load_cached(paths[0], frozen=True, cache=cache) is c0
+
+def test_load_cached_evicts_by_size(tmp_path):
+    cache = libconf.ConfigCache(maxbytes=25)
+    paths = [str(tmp_path / ('%d.cfg' % i)) for i in range(3)]
+    for i, path in enumerate(paths):
+        write(path, u'a = "%s";' % ('x' * 5))
+        libconf.load_cached(path, cache=cache)
+
+    assert len(cache.entries) == 2
+    assert cache.nbytes == 24
+
+
+# Tests for load(..., cache_dir=...)
+####################################
+
+def load_from_disk_cache(path, cache_dir, **kwargs):
+    with io.open(str(path), 'r', encoding='utf-8') as f:
+        return libconf.load(f, cache_dir=str(cache_dir), **kwargs)
+
+def test_disk_cache_reuses_result(tmp_path, monkeypatch):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = { b = [1, 2]; c = 10L; };')
+    cache_dir = tmp_path / 'cache'
+
+    c1 = load_from_disk_cache(path, cache_dir)
+    assert len(os.listdir(str(cache_dir))) == 1
+
+    def fail(self):
+        raise AssertionError('cached result not used')
+    monkeypatch.setattr(libconf.Parser, 'parse', fail)
+    c2 = load_from_disk_cache(path, cache_dir)
+
+    assert c2 == c1 == {'a': {'b': [1, 2], 'c': 10}}
+    assert isinstance(c2.a, libconf.AttrDict)
+    assert c2.a.b == [1, 2]
+
+def test_disk_cache_reloads_changed_include(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;\n@include "inc.cfg"\n')
+    write(tmp_path / 'inc.cfg', u'b = 1;', mtime=1000000)
+    cache_dir = tmp_path / 'cache'
+    c = load_from_disk_cache(path, cache_dir, includedir=str(tmp_path))
+    assert c == {'a': 1, 'b': 1}
+
+    write(tmp_path / 'inc.cfg', u'b = 2;', mtime=2000000)
+    c = load_from_disk_cache(path, cache_dir, includedir=str(tmp_path))
+    assert c == {'a': 1, 'b': 2}
+
+def test_disk_cache_keys_on_select(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1; b = 2;')
+    cache_dir = tmp_path / 'cache'
+
+    assert load_from_disk_cache(path, cache_dir, select=['a']) == {'a': 1}
+    assert load_from_disk_cache(path, cache_dir) == {'a': 1, 'b': 2}
+
+def test_disk_cache_skips_anonymous_factories(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = { b = 1; };')
+    cache_dir = tmp_path / 'cache'
+
+    for factory in [lambda settings: dict(settings),
+                    lambda settings: collections.OrderedDict(settings),
+                    functools.partial(libconf.AttrDict)]:
+        c = load_from_disk_cache(path, cache_dir, dict_factory=factory)
+        assert type(c['a']) is type(factory([]))
+    assert not cache_dir.exists()
+
+def test_disk_cache_ignores_broken_cache_files(tmp_path):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;')
+    cache_dir = tmp_path / 'cache'
+    load_from_disk_cache(path, cache_dir)
+
+    for name in os.listdir(str(cache_dir)):
+        write(cache_dir / name, u'garbage')
+    assert load_from_disk_cache(path, cache_dir) == {'a': 1}
+
+def test_disk_cache_concurrent_writes(tmp_path, monkeypatch):
+    path = tmp_path / 'main.cfg'
+    write(path, u'a = 1;')
+    cache_dir = tmp_path / 'cache'
+    cache = libconf.DiskCache(str(cache_dir))
+    files = [(str(path), libconf.file_state(str(path)))]
+    cache_file = str(cache_dir / 'x.pickle')
+
+    # Both threads write their temporary files at the same time.
+    barrier = threading.Barrier(2)
+    tmp_counts = []
+    original = pickle.dump
+    def dump(*args):
+        barrier.wait(5)
+        tmp_counts.append(len([name for name in os.listdir(str(cache_dir))
+                               if name.endswith('.tmp')]))
+        barrier.wait(5)
+        return original(*args)
+    monkeypatch.setattr(pickle, 'dump', dump)
+
+    threads = [threading.Thread(target=cache.write,
+                                args=(cache_file, 'key', files, {'a': 1}))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tmp_counts == [2, 2]
+    assert os.listdir(str(cache_dir)) == ['x.pickle']
+    assert cache.read(cache_file, 'key') == {'a': 1}
+
+def test_disk_cache_without_file_name(tmp_path):
+    f = io.StringIO(u'a = 1;')
+    cache_dir = tmp_path / 'cache'
+    assert libconf.load(f, cache_dir=str(cache_dir)) == {'a': 1}
+    assert not cache_dir.exists()
+
+
+# Tests for IncludeCache
+########################
+
+def count_reads(monkeypatch):
+    reads = []
+    original = libconf.IncludeCache.open
+    def open(self, includefilename):
+        reads.append(os.path.basename(includefilename))
+        return original(self, includefilename)
+    monkeypatch.setattr(libconf.IncludeCache, 'open', open)
+    return reads
+
+def test_include_cache_reads_repeated_includes_once(tmp_path, monkeypatch):
+    write(tmp_path / 'common.cfg', u'x = 1;')
+    write(tmp_path / 'sub.cfg', u'@include "common.cfg"\n')
+    reads = count_reads(monkeypatch)
+
+    # The first include is streamed, the second one is read into the cache.
+    c = libconf.loads(u'a = {\n@include "common.cfg"\n};\n'
+                      u'b = {\n@include "sub.cfg"\n};\n'
+                      u'c = {\n@include "common.cfg"\n};\n',
+                      includedir=str(tmp_path))
+    assert c == {'a': {'x': 1}, 'b': {'x': 1}, 'c': {'x': 1}}
+    assert reads == ['common.cfg', 'sub.cfg', 'common.cfg']
+
+    libconf.loads(u'@include "common.cfg"\n', includedir=str(tmp_path))
+    assert reads == ['common.cfg', 'sub.cfg', 'common.cfg', 'common.cfg']
+
+def test_include_cache_across_loads(tmp_path, monkeypatch):
+    write(tmp_path / 'common.cfg', u'@include "sub.cfg"\n')
+    write(tmp_path / 'sub.cfg', u'x = 1;', mtime=1000000)
+    cache = libconf.IncludeCache()
+    reads = count_reads(monkeypatch)
+
+    def load(text):
+        includefiles = []
+        f = io.StringIO(text)
+        tokens = libconf.TokenStream.from_file(
+            f, includedir=str(tmp_path), includefiles=includefiles,
+            include_cache=cache)
+        c = libconf.Parser(tokens).parse()
+        return c, sorted(os.path.basename(name) for name in includefiles)
+
+    assert load(u'@include "common.cfg"\n') == ({'x': 1},
+                                                ['common.cfg', 'sub.cfg'])
+    assert load(u'a = {\n@include "common.cfg"\n};') == (
+        {'a': {'x': 1}}, ['common.cfg', 'sub.cfg'])
+    assert reads == ['common.cfg', 'sub.cfg']
+
+    write(tmp_path / 'sub.cfg', u'x = 2;', mtime=2000000)
+    assert load(u'@include "common.cfg"\n')[0] == {'x': 2}
+    assert reads == ['common.cfg', 'sub.cfg', 'common.cfg', 'sub.cfg']
+
+def test_include_cache_detects_circular_includes(tmp_path):
+    write(tmp_path / 'a.cfg', u'@include "b.cfg"\n')
+    write(tmp_path / 'b.cfg', u'x = 1;')
+    cache = libconf.IncludeCache()
+    libconf.loads(u'@include "a.cfg"\n', includedir=str(tmp_path),
+                  include_cache=cache)
+
+    # a.cfg is cached, but includes the file being loaded.
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(u'@include "a.cfg"\n', includedir=str(tmp_path),
+                      filename=os.path.join(str(tmp_path), 'b.cfg'),
+                      include_cache=cache)
+    assert 'Circular include' in str(excinfo.value)
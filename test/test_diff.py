@@ -0,0 +1,151 @@
+import array
+
+import pytest
+
+import libconf
+
+
+OLD = u'''
+    a = 1;
+    b = { c = "x"; d = (1, { e = 2; }); f = [1, 2]; };
+    g = 5;
+    h = [1, 2];
+'''
+
+NEW = u'''
+    a = 1L;
+    b = { c = "y"; d = (1, { e = 3; }); f = [1, 2, 3]; n = true; };
+    h = (1, 2);
+    i = 1.5;
+'''
+
+
+def strict_equal(a, b):
+    '''Compare values and their libconfig types, recursively'''
+    if libconf.get_dump_type(a) != libconf.get_dump_type(b):
+        return False
+    if isinstance(a, dict):
+        return (list(a) == list(b) and
+                all(strict_equal(a[k], b[k]) for k in a))
+    if isinstance(a, (tuple, list)):
+        return (len(a) == len(b) and
+                all(strict_equal(x, y) for x, y in zip(a, b)))
+    return a == b
+
+
+# Tests for diff()
+##################
+
+def test_diff_reports_changes():
+    changes = libconf.diff(libconf.loads(OLD), libconf.loads(NEW))
+
+    assert changes == [
+        ('removed', ('g',), 5, None),
+        ('type', ('a',), 1, 1),
+        ('changed', ('b', 'c'), 'x', 'y'),
+        ('changed', ('b', 'd', 1, 'e'), 2, 3),
+        ('changed', ('b', 'f'), [1, 2], [1, 2, 3]),
+        ('added', ('b', 'n'), None, True),
+        ('type', ('h',), [1, 2], (1, 2)),
+        ('added', ('i',), None, 1.5),
+    ]
+    assert changes[0].kind == 'removed' and changes[0].path == ('g',)
+    assert isinstance(changes[1].new, libconf.LibconfInt64)
+
+def test_diff_identical_configs():
+    assert libconf.diff(libconf.loads(OLD), libconf.loads(OLD)) == []
+    c = libconf.loads(OLD)
+    assert libconf.diff(c, c) == []
+
+def test_diff_scalar_types():
+    def diff(a, b):
+        return libconf.diff({'v': a}, {'v': b})
+
+    assert diff(1, True) == [('changed', ('v',), 1, True)]
+    assert diff(1, 1.0) == [('changed', ('v',), 1, 1.0)]
+    assert diff(2**40, libconf.LibconfInt64(2**40)) == []
+    assert diff([1, 2], [1, libconf.LibconfInt64(2)]) == \
+        [('type', ('v', 1), 2, 2)]
+    assert diff((1, {'a': 1}), [1, {'a': 1}]) == \
+        [('type', ('v',), (1, {'a': 1}), [1, {'a': 1}])]
+    assert diff((1, 2), [1, 3]) == [('changed', ('v',), (1, 2), [1, 3])]
+    assert diff(array.array('i', [1, 2]), [1, 2]) == []
+    assert diff(array.array('i', [1, 2]), [1, 3]) == \
+        [('changed', ('v', 1), 2, 3)]
+
+def test_diff_typed_arrays_by_array_type():
+    def diff(a, b):
+        return libconf.diff({'v': a}, {'v': b})
+
+    i64 = libconf.LibconfInt64
+    assert diff(array.array('q', [5, 6]), [i64(5), i64(6)]) == []
+    assert diff(array.array('q', [1]), [1]) == \
+        [('type', ('v',), array.array('q', [1]), [1])]
+    assert diff([1], array.array('q', [1])) == \
+        [('type', ('v',), [1], array.array('q', [1]))]
+    assert diff(array.array('q', [1, 2]), [1, 3]) == \
+        [('changed', ('v',), array.array('q', [1, 2]), [1, 3])]
+    assert diff(array.array('q', [5]), (i64(5),)) == \
+        [('type', ('v',), array.array('q', [5]), (5,))]
+
+    a = libconf.loads(u'x = [5L, 6L]; y = [1L];', typed_arrays=True)
+    b = libconf.loads(u'x = [5L, 6L]; y = [1];')
+    assert libconf.diff(a, b) == [('type', ('y',), a.y, b.y)]
+    patched = libconf.patch(a, libconf.diff(a, b))
+    assert libconf.diff(patched, b) == []
+    assert libconf.dumps(patched) == libconf.dumps(b)
+
+def test_diff_skips_shared_values():
+    class Unequal(object):
+        def __eq__(self, other):
+            raise AssertionError("shared value compared")
+
+    shared = libconf.AttrDict([('x', Unequal())])
+    assert libconf.diff({'a': shared, 'b': 1}, {'a': shared, 'b': 2}) == \
+        [('changed', ('b',), 1, 2)]
+
+
+# Tests for patch()
+###################
+
+def test_patch_applies_diff():
+    old = libconf.loads(OLD)
+    new = libconf.loads(NEW)
+    old_text = libconf.dumps(old)
+
+    patched = libconf.patch(old, libconf.diff(old, new))
+    assert strict_equal(patched, new)
+    assert libconf.dumps(old) == old_text
+
+def test_patch_shares_unchanged_values():
+    old = libconf.loads(OLD)
+    changes = [libconf.Change('changed', ('b', 'd', 1, 'e'), 2, 7)]
+
+    patched = libconf.patch(old, changes)
+    assert patched.b.d == (1, {'e': 7})
+    assert isinstance(patched, libconf.AttrDict)
+    assert isinstance(patched.b.d[1], libconf.AttrDict)
+    assert patched.b.f is old.b.f
+    assert old.b.d[1].e == 2
+    assert libconf.diff(old, patched) == changes
+
+def test_patch_frozen_and_typed_arrays():
+    old = libconf.freeze(libconf.loads(u'a = { b = 1; }; c = [1, 2];'))
+    patched = libconf.patch(old, [('changed', ('a', 'b'), 1, 2)])
+    assert patched == {'a': {'b': 2}, 'c': [1, 2]}
+    assert old.a.b == 1
+
+    old = libconf.loads(u'a = [1, 2];', typed_arrays=True)
+    patched = libconf.patch(old, [('changed', ('a', 1), 2, 5)])
+    assert patched.a == array.array('i', [1, 5])
+    assert old.a == array.array('i', [1, 2])
+
+def test_patch_errors():
+    c = libconf.loads(OLD)
+    with pytest.raises(KeyError):
+        libconf.patch(c, [('changed', ('x', 'y'), 1, 2)])
+    with pytest.raises(ValueError):
+        libconf.patch(c, [('changed', ('b',), 1, 2),
+                          ('changed', ('b', 'c'), 'x', 'y')])
+    with pytest.raises(ValueError):
+        libconf.patch(c, [('removed', ('h', 0), 1, None)])
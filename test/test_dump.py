@@ -176,3 +176,49 @@ def test_LibconfInt64_produces_L_suffix():
     c = {'a': libconf.LibconfInt64(2)}
     c_dumped = dump_dict(c).replace(" ", "").replace("\n", "")
     assert c_dumped == 'a=2L;'
+
+def test_streams_match_materialized_collections():
+    c = {'a': [1, 2, 3], 'b': (1, "x", [1.5]), 'c': [], 'd': ()}
+    c_stream = {
+        'a': libconf.LibconfArrayStream(iter([1, 2, 3])),
+        'b': libconf.LibconfListStream(v for v in (1, "x", [1.5])),
+        'c': libconf.LibconfArrayStream(iter([])),
+        'd': libconf.LibconfListStream(iter([])),
+    }
+    assert dump_dict(c_stream) == dump_dict(c)
+
+def test_array_stream_int64_after_int_raises():
+    c = {'a': libconf.LibconfArrayStream(iter([1, 2**65]))}
+    with pytest.raises(libconf.ConfigSerializeError):
+        dump_dict(c)
+
+def test_array_stream_int_after_int64_is_promoted():
+    c = {'a': libconf.LibconfArrayStream(iter([libconf.LibconfInt64(1), 2]))}
+    c_dumped = dump_dict(c).replace(" ", "").replace("\n", "")
+    assert c_dumped == 'a=[1L,2L];'
+
+def test_array_stream_with_mixed_types_raises():
+    c = {'a': libconf.LibconfArrayStream(iter([1, "str"]))}
+    with pytest.raises(libconf.ConfigSerializeError):
+        dump_dict(c)
+
+def test_dump_writes_streams_in_batches(monkeypatch):
+    monkeypatch.setattr(libconf.FragmentBuffer, 'batch_size', 10)
+    writes = []
+
+    class File(object):
+        def write(self, s):
+            writes.append(s)
+
+    def produce(n):
+        for i in range(n):
+            # Earlier batches must have been written already.
+            assert len(u''.join(writes)) >= 3 * (i - 20)
+            yield i
+
+    c = {'a': libconf.LibconfArrayStream(produce(100)),
+         'b': libconf.LibconfListStream(produce(100))}
+    libconf.dump(c, File())
+    assert len(writes) > 10
+    assert u''.join(writes) == libconf.dumps({'a': list(range(100)),
+                                              'b': tuple(range(100))})
@@ -52,6 +52,26 @@ def test_circular_include_raises():
         with pytest.raises(libconf.ConfigParseError):
             libconf.load(f, includedir=CURDIR)
 
+def test_loads_all_scalar_types():
+    config = libconf.loads(u'''a = ["x" "y", true, 1, 1.5, 0x1F, 2L, 0x1FL];
+                              b = ("x", FALSE, -1, .5, 0XA, -2LL, 0xaLL);''')
+    assert config.a == ["xy", True, 1, 1.5, 31, 2, 31]
+    assert config.b == ("x", False, -1, 0.5, 10, -2, 10)
+    assert [type(v) for v in config.a[-2:]] == [libconf.LibconfInt64] * 2
+
+def test_missing_value_raises():
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(u'a = (1, =);')
+
+    assert 'expected: (\')\',)' in str(excinfo.value)
+
+def test_parse_error_reports_location():
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(u'a = 1;\n/* x\n */  b = ;', filename='<cfg>')
+
+    assert str(excinfo.value) == ("Unexpected token ';' in '<cfg>', row 3, "
+                                  "column 10; expected a value")
+
 def test_loads_of_bytes_throws():
     with pytest.raises(TypeError) as excinfo:
         libconf.loads(b'')
@@ -0,0 +1,159 @@
+import random
+
+import pytest
+
+import libconf
+
+
+CONFIG = u'''# header
+a = 1;
+b = { c = "x"; d = (1, 2, { e = true; }); };
+// comment
+f = [1, 2, 3]; g = 0x10L
+/* block
+   comment */
+h = "multi" "part";
+'''
+
+
+def edit_text(text, offset, deleted, inserted):
+    return text[:offset] + inserted + text[offset + deleted:]
+
+
+# Tests for IncrementalConfig
+#############################
+
+def test_incremental_initial_parse():
+    state = libconf.IncrementalConfig(CONFIG)
+    assert state.config == libconf.loads(CONFIG)
+    assert state.full_parses == 1
+
+def test_incremental_edit_value_in_place():
+    state = libconf.IncrementalConfig(CONFIG)
+    config = state.config
+    b = config.b
+    offset = CONFIG.index('"x"')
+
+    assert state.edit(offset, 3, u'"yz"') is config
+    assert config.b.c == 'yz'
+    assert config.a == 1 and config.f == [1, 2, 3]
+    assert config.b is not b
+    assert state.text == edit_text(CONFIG, offset, 3, u'"yz"')
+    assert state.full_parses == 1
+
+def test_incremental_add_rename_and_remove_settings():
+    state = libconf.IncrementalConfig(CONFIG)
+    config = state.config
+
+    offset = CONFIG.index('// comment')
+    state.edit(offset, 0, u'new = 5;\n')
+    assert list(config.keys()) == ['a', 'b', 'new', 'f', 'g', 'h']
+
+    state.edit(0, len('# header\na'), u'z')
+    assert list(config.keys()) == ['z', 'b', 'new', 'f', 'g', 'h']
+
+    offset = state.text.index('f = ')
+    state.edit(offset, len('f = [1, 2, 3]; '), u'')
+    assert list(config.keys()) == ['z', 'b', 'new', 'g', 'h']
+    assert config == libconf.loads(state.text)
+    assert state.full_parses == 1
+
+def test_incremental_edit_in_comments():
+    state = libconf.IncrementalConfig(CONFIG)
+
+    state.edit(CONFIG.index('comment'), 0, u'a ')
+    state.edit(state.text.index('block') + 5, 0, u'\n = 7;')
+    assert state.config == libconf.loads(CONFIG)
+    assert state.full_parses == 1
+
+    # Joining the line comment with the next line comments out a setting.
+    offset = state.text.index('// a comment') + len('// a comment')
+    state.edit(offset, 1, u' ')
+    assert 'f' not in state.config and 'g' not in state.config
+    assert state.config == libconf.loads(state.text)
+
+def test_incremental_structural_edits_fall_back_to_full_parse():
+    state = libconf.IncrementalConfig(CONFIG)
+
+    # Open a group in the first setting, which the rest doesn't close.
+    with pytest.raises(libconf.ConfigParseError):
+        state.edit(CONFIG.index('a = 1;'), len('a = 1;'), u'a = { x = 1;')
+    assert state.full_parses == 2
+
+    state.edit(len(state.text), 0, u'};')
+    assert list(state.config.keys()) == ['a']
+    assert state.config == libconf.loads(state.text)
+    assert state.full_parses == 3
+
+def test_incremental_parse_error_keeps_config():
+    state = libconf.IncrementalConfig(CONFIG)
+    config = dict(state.config)
+
+    offset = CONFIG.index('1;')
+    with pytest.raises(libconf.ConfigParseError):
+        state.edit(offset, 1, u'')
+    assert state.config == config
+
+    state.edit(offset, 0, u'2')
+    assert state.config.a == 2
+    assert state.full_parses == 3
+
+def test_incremental_with_includes_and_duplicates():
+    text = u'a = 1;\n@include "test/include.cfg"\na = 2;\n'
+    state = libconf.IncrementalConfig(text)
+    assert state.config == libconf.loads(text)
+
+    state.edit(text.index('2;'), 1, u'3')
+    assert state.config == libconf.loads(state.text)
+    assert state.config.a == 3
+    assert state.full_parses == 2
+
+    text = u'a = 1;\nb = 2;\na = 3;\n'
+    state = libconf.IncrementalConfig(text)
+    state.edit(text.index('3'), 1, u'4')
+    state.edit(text.index('b'), 1, u'a')
+    assert state.config == libconf.loads(state.text) == {'a': 4}
+    assert state.full_parses == 1
+
+def test_incremental_edit_out_of_range():
+    state = libconf.IncrementalConfig(CONFIG)
+    with pytest.raises(ValueError):
+        state.edit(len(CONFIG), 1, u'')
+
+def test_incremental_rejects_select_and_lazy_parser():
+    with pytest.raises(ValueError):
+        libconf.IncrementalConfig(u'a = 1; b = 2;', select=['a'])
+    with pytest.raises(ValueError):
+        libconf.IncrementalConfig(u'a = 1; b = 2;',
+                                  parser=libconf.LazyParser)
+
+def test_incremental_random_edits_match_loads():
+    rnd = random.Random(0)
+    pieces = [u'a', u'1', u'"', u';', u'=', u' ', u'\n', u'#', u'{', u'}',
+              u'(', u')', u'x = 2;', u'/*', u'*/', u'e', u'L', u'//', u',',
+              u'[', u']', u'true', u'b']
+    state = libconf.IncrementalConfig(CONFIG, dict_factory=libconf.SlimAttrDict,
+                                      parser=libconf.IterativeParser)
+
+    for _ in range(2000):
+        text = state.text
+        offset = rnd.randint(0, len(text))
+        deleted = rnd.randint(0, min(3, len(text) - offset))
+        inserted = u''.join(rnd.choice(pieces)
+                            for _ in range(rnd.randint(0, 2)))
+        try:
+            expected = libconf.loads(edit_text(text, offset, deleted,
+                                               inserted),
+                                     dict_factory=libconf.SlimAttrDict)
+        except (libconf.ConfigParseError, ValueError) as e:
+            # ValueError: tokens like '010L' that int() can't convert.
+            with pytest.raises(type(e)):
+                state.edit(offset, deleted, inserted)
+            state = libconf.IncrementalConfig(
+                CONFIG, dict_factory=libconf.SlimAttrDict,
+                parser=libconf.IterativeParser)
+            continue
+
+        result = state.edit(offset, deleted, inserted)
+        assert result == expected
+        assert list(result.keys()) == list(expected.keys())
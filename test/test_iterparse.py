@@ -0,0 +1,104 @@
+import os
+import io
+import pytest
+
+import libconf
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+# Helper functions
+##################
+
+def build(events):
+    '''Rebuild the load() result from iterparse() events'''
+    stack = [[]]
+    for event, value in events:
+        if event.startswith('start_'):
+            stack.append([])
+        elif event.startswith('end_'):
+            items = stack.pop()
+            if event == 'end_group':
+                value = libconf.AttrDict(zip(items[::2], items[1::2]))
+            elif event == 'end_list':
+                value = tuple(items)
+            else:
+                value = items
+            stack[-1].append(value)
+        else:
+            stack[-1].append(value)
+
+    return stack[0][0]
+
+
+# Tests for iterparse()
+#######################
+
+def test_iterparse_events():
+    f = io.StringIO(u'a = 1; b = { c = ("x", [1.5, 2.5],); }; d = [];')
+    events = list(libconf.iterparse(f))
+
+    assert events == [
+        ('start_group', None),
+        ('key', 'a'), ('scalar', 1),
+        ('key', 'b'), ('start_group', None),
+        ('key', 'c'), ('start_list', None),
+        ('scalar', 'x'),
+        ('start_array', None), ('scalar', 1.5), ('scalar', 2.5),
+        ('end_array', None),
+        ('end_list', None),
+        ('end_group', None),
+        ('key', 'd'), ('start_array', None), ('end_array', None),
+        ('end_group', None),
+    ]
+
+def test_iterparse_events_rebuild_load_result():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        c = build(libconf.iterparse(f, includedir=CURDIR))
+
+    assert c == expected
+
+def test_iterparse_is_lazy():
+    f = io.StringIO(u'a = 1; b = 2; @')
+    events = libconf.iterparse(f)
+
+    assert next(events) == ('start_group', None)
+    assert next(events) == ('key', 'a')
+    with pytest.raises(libconf.ConfigParseError):
+        list(events)
+
+def test_iterparse_is_lazy_through_includes(tmpdir):
+    tmpdir.join('inc.cfg').write(u'a = 1; b = 2; @')
+    f = io.StringIO(u'x = 1;\n@include "inc.cfg"\n')
+    events = libconf.iterparse(f, includedir=str(tmpdir))
+
+    assert [next(events) for _ in range(4)] == [
+        ('start_group', None), ('key', 'x'), ('scalar', 1), ('key', 'a')]
+    with pytest.raises(libconf.ConfigParseError):
+        list(events)
+
+@pytest.mark.parametrize('input', [
+    u'a = (1, 2',
+    u'a = { b = 1; ',
+    u'a = { b = ; };',
+    u'a = [1, (2)];',
+    u'a = (1, 2) b',
+    u'a = 1; }',
+])
+def test_iterparse_errors_match_load(input):
+    with pytest.raises(libconf.ConfigParseError) as expected:
+        libconf.loads(input)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        list(libconf.iterparse(io.StringIO(input)))
+
+    assert str(excinfo.value) == str(expected.value)
+
+def test_iterparse_of_BytesIO_throws():
+    with pytest.raises(TypeError) as excinfo:
+        libconf.iterparse(io.BytesIO(b'a: "37";'))
+
+    assert 'libconf.iterparse' in str(excinfo.value)
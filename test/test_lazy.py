@@ -0,0 +1,100 @@
+import copy
+import os
+import io
+import pytest
+
+import libconf
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+CONFIG = u'''
+    a = { b = { c = 1; d = "\\x41"; }; e = (1, { f = 2; }); };
+    g = [1, 2];
+    h = { };
+'''
+
+
+# Tests for LazyParser and LazyAttrDict
+#######################################
+
+def test_lazy_load_defers_groups():
+    c = libconf.loads(CONFIG, parser=libconf.LazyParser)
+
+    assert isinstance(c, libconf.LazyAttrDict)
+    raw = dict.__getitem__(c, 'a')
+    assert isinstance(raw, libconf.LazyGroup)
+
+    assert c.a.b.c == 1
+    assert isinstance(dict.__getitem__(c, 'a'), libconf.LazyAttrDict)
+    assert c['a']['e'] == (1, {'f': 2})
+    assert c.g == [1, 2]
+
+def test_lazy_load_matches_eager_load():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        c = libconf.load(f, includedir=CURDIR, parser=libconf.LazyParser)
+
+    assert c == expected
+    assert expected == c
+    assert list(c.keys()) == list(expected.keys())
+    assert libconf.dumps(c) == libconf.dumps(expected)
+
+def test_lazy_load_dict_methods_resolve_groups():
+    expected = libconf.loads(CONFIG)
+
+    def lazy():
+        return libconf.loads(CONFIG, parser=libconf.LazyParser)
+
+    assert list(lazy().values()) == list(expected.values())
+    assert list(lazy().items()) == list(expected.items())
+    assert lazy().get('a') == expected['a']
+    assert lazy().get('x', 5) == 5
+    assert lazy().pop('a') == expected['a']
+    assert lazy().setdefault('h') == {}
+    assert lazy().copy() == expected
+    assert copy.deepcopy(lazy()) == expected
+    assert repr(lazy()).replace('LazyAttrDict', 'AttrDict') == \
+        repr(expected)
+    assert lazy() == lazy()
+    assert not lazy() != lazy()
+
+def test_lazy_load_with_select():
+    c = libconf.loads(CONFIG, parser=libconf.LazyParser, select=['a.b.d'])
+
+    assert c == {'a': {'b': {'d': 'A'}}}
+
+def test_lazy_load_raises_syntax_errors_on_access():
+    c = libconf.loads(u'a = { b = ; }; c = 1;', parser=libconf.LazyParser)
+
+    assert c.c == 1
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        c.a
+
+    assert "row 1, column 11" in str(excinfo.value)
+
+def test_lazy_load_raises_unbalanced_brackets_immediately():
+    with pytest.raises(libconf.ConfigParseError):
+        libconf.loads(u'a = { b = (1; };', parser=libconf.LazyParser)
+
+def test_lazy_group_keeps_text_not_tokens():
+    c = libconf.loads(u'a = { b = 1; c = "x y"; }; d = 2;',
+                      parser=libconf.LazyParser)
+    raw = dict.__getitem__(c, 'a')
+    assert raw.text == u'{ b = 1 ; c = "x y" ; }'
+    assert c.a == {'b': 1, 'c': 'x y'}
+
+def test_lazy_load_error_locations_in_includes(tmpdir):
+    tmpdir.join('inc.cfg').write(u'b = 1;\nc = ;\n')
+    text = u'a = {\n  x = 0;\n@include "inc.cfg"\n};\n'
+    c = libconf.loads(text, includedir=str(tmpdir),
+                      parser=libconf.LazyParser)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        c.a
+    with pytest.raises(libconf.ConfigParseError) as expected:
+        libconf.loads(text, includedir=str(tmpdir))
+
+    assert "inc.cfg', row 2, column 5" in str(excinfo.value)
+    assert str(excinfo.value) == str(expected.value)
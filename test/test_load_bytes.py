@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import pytest
+
+import libconf
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+# Tests for load_bytes() and load_path()
+########################################
+
+def test_load_path_matches_load():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+
+    c = libconf.load_path(example_file, includedir=CURDIR)
+    assert c == expected
+    assert c.appconfig.sub_group.sub_sub_group['include-works'] == True
+
+def test_load_bytes_scalar_types():
+    c = libconf.load_bytes(b'a = ["x" "y", true, 1, 1.5, 0x1F, 2L, 0x1FL];')
+    assert c.a == ["xy", True, 1, 1.5, 31, 2, 31]
+    assert [type(v) for v in c.a[-2:]] == [libconf.LibconfInt64] * 2
+
+def test_load_bytes_decodes_strings():
+    c = libconf.load_bytes(u'a = "☃ \\x41";'.encode('utf-8'))
+    assert c.a == u'☃ A'
+    assert isinstance(list(c.keys())[0], type(u''))
+
+def test_load_bytes_error_location_in_characters():
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.load_bytes(u'a = "☃☃";\nb = "☃" ?;'.encode('utf-8'))
+    assert "row 2, column 9: '?;'" in str(excinfo.value)
+
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.load_bytes(u'a = "☃";\nb = 12 13;'.encode('utf-8'))
+    assert "found '13' in '<unknown>', row 2, column 8" in str(excinfo.value)
+
+def test_load_bytes_accepts_unicode_whitespace_like_loads():
+    text = u'a = 1;\xa0b = 2; c = "\xe9";'
+    assert libconf.load_bytes(text.encode('utf-8')) == libconf.loads(text)
+
+    text = u'a = "\xe9";\xa0b = ;'
+    with pytest.raises(libconf.ConfigParseError) as expected:
+        libconf.loads(text)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.load_bytes(text.encode('utf-8'))
+    assert str(excinfo.value) == str(expected.value)
+
+def test_load_bytes_circular_include_raises():
+    circular_file = os.path.join(CURDIR, 'circular1.cfg')
+    with pytest.raises(libconf.ConfigParseError):
+        libconf.load_path(circular_file, includedir=CURDIR)
+
+def test_load_path_empty_file(tmp_path):
+    path = tmp_path / 'empty.cfg'
+    path.write_bytes(b'')
+    assert libconf.load_path(str(path)) == {}
+
+def test_load_path_with_lazy_parser(tmp_path):
+    path = tmp_path / 'main.cfg'
+    path.write_bytes(b'a = { b = 1; };\nc = { d = [1, 2]; };')
+    c = libconf.load_path(str(path), parser=libconf.LazyParser)
+    assert c.c.d == [1, 2]
+    assert c == {'a': {'b': 1}, 'c': {'d': [1, 2]}}
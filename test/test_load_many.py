@@ -0,0 +1,41 @@
+import io
+import os
+import pytest
+
+import libconf
+
+
+def write_files(tmp_path, texts):
+    paths = []
+    for i, text in enumerate(texts):
+        path = str(tmp_path / ('%d.cfg' % i))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+TEXTS = [u'a = 1;', u'a = ;', u'a = { b = [1, 2]; c = 3L; };', u'a = "x";']
+
+@pytest.mark.parametrize('workers,threads', [(1, False), (2, False),
+                                             (2, True)])
+def test_load_many_keeps_order_and_errors(tmp_path, workers, threads):
+    paths = write_files(tmp_path, TEXTS)
+    results = libconf.load_many(paths, workers=workers, threads=threads)
+
+    assert len(results) == 4
+    assert results[0] == {'a': 1}
+    assert isinstance(results[1], libconf.ConfigParseError)
+    assert results[2] == {'a': {'b': [1, 2], 'c': 3}}
+    assert isinstance(results[2].a, libconf.AttrDict)
+    assert isinstance(results[2].a.c, libconf.LibconfInt64)
+    assert results[3].a == 'x'
+
+def test_load_many_with_includes(tmp_path):
+    paths = write_files(tmp_path, [u'x = 1;', u'@include "0.cfg"\ny = 2;'])
+    results = libconf.load_many(paths, includedir=str(tmp_path), workers=2)
+    assert results == [{'x': 1}, {'x': 1, 'y': 2}]
+
+def test_load_many_raises_other_errors(tmp_path):
+    with pytest.raises((IOError, OSError)):
+        libconf.load_many([str(tmp_path / 'missing.cfg')] * 2, workers=2)
@@ -0,0 +1,201 @@
+import os
+import io
+import pytest
+
+import libconf
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+
+# Tests for TokenStream
+#######################
+
+def test_tokenstream_pulls_tokens_lazily():
+    pulled = []
+
+    def tokens():
+        for t in libconf.Tokenizer('<memory>').scan(u'a = 1; b = 2;'):
+            pulled.append(t)
+            yield t
+
+    stream = libconf.TokenStream(tokens())
+    assert len(pulled) == 1
+
+    assert stream.expect('name')[1] == 'a'
+    assert stream.accept(':', '=')[1] == '='
+    assert len(pulled) == 3
+    assert stream.peek()[1] == '1'
+
+def test_tokenstream_finished():
+    stream = libconf.TokenStream(libconf.Tokenizer('<memory>').scan(u'a'))
+    assert not stream.finished()
+    assert stream.consume()[1] == 'a'
+    assert stream.finished()
+    assert stream.consume() is None
+    assert stream.peek() is None
+
+
+# Tests for IterativeParser
+###########################
+
+def test_iterative_parser_matches_recursive_parser():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        c = libconf.load(f, includedir=CURDIR,
+                         parser=libconf.IterativeParser)
+
+    assert c == expected
+
+def test_iterative_parser_empty_and_trailing_comma():
+    c = libconf.loads(u'a = (); b = {}; c = (1, (2,), {d = [];},);',
+                      parser=libconf.IterativeParser)
+
+    assert c == {'a': (), 'b': {}, 'c': (1, (2,), {'d': []})}
+
+@pytest.mark.parametrize('input', [
+    u'a = (1, 2',
+    u'a = { b = 1; ',
+    u'a = { b = ; };',
+    u'a = { b = (1, 2; };',
+    u'a = (1, 2) b',
+    u'a = ({}, {c}, );',
+])
+def test_iterative_parser_errors_match_recursive_parser(input):
+    with pytest.raises(libconf.ConfigParseError) as expected:
+        libconf.loads(input)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(input, parser=libconf.IterativeParser)
+
+    assert str(excinfo.value) == str(expected.value)
+
+def test_iterative_parser_deeply_nested_lists():
+    depth = 20000
+    c = libconf.loads(u'a = ' + u'(' * depth + u'1' + u')' * depth + u';',
+                      parser=libconf.IterativeParser)
+
+    value = c.a
+    for i in range(depth):
+        assert len(value) == 1
+        value = value[0]
+    assert value == 1
+
+def test_iterative_parser_deeply_nested_groups():
+    depth = 20000
+    c = libconf.loads(u'a = ' + u'{ a = ' * depth + u'1;' + u'};' * depth,
+                      parser=libconf.IterativeParser)
+
+    value = c.a
+    for i in range(depth):
+        value = value.a
+    assert value == 1
+
+def test_recursive_parser_fails_on_deep_nesting():
+    depth = 20000
+    with pytest.raises(RuntimeError):
+        libconf.loads(u'a = ' + u'(' * depth + u')' * depth + u';')
+
+
+# Tests for chunked reading
+###########################
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8, 13, 64])
+def test_chunked_reading_matches_whole_file(monkeypatch, chunk_size):
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        expected = libconf.load(f, includedir=CURDIR)
+
+    monkeypatch.setattr(libconf.TokenStream, 'chunk_size', chunk_size)
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        c = libconf.load(f, includedir=CURDIR)
+
+    assert c == expected
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64])
+def test_chunked_reading_error_location(monkeypatch, chunk_size):
+    monkeypatch.setattr(libconf.TokenStream, 'chunk_size', chunk_size)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(u'a = "x\ny";\n/* c */ b = 1e5;\n  c = 1; @include "x"')
+
+    assert 'row 4, column 10' in str(excinfo.value)
+    assert "'@include" in str(excinfo.value)
+
+def test_chunked_reading_of_tokens_spanning_chunks(monkeypatch):
+    monkeypatch.setattr(libconf.TokenStream, 'chunk_size', 4)
+    c = libconf.loads(u'a = "a long string\\"with escapes";\n'
+                      u'/* a long\n comment */ b = 123456789e-3;\n'
+                      u'c = 0x123456789ABCDEFL; d = tRuE;')
+
+    assert c == {'a': 'a long string"with escapes', 'b': 123456.789,
+                 'c': 0x123456789ABCDEF, 'd': True}
+
+
+# Tests for container factories
+###############################
+
+@pytest.mark.parametrize('parser', [libconf.Parser, libconf.IterativeParser])
+def test_container_factories(parser):
+    c = libconf.loads(u'a = { b = (1, [2, 3], { c = 4; }); c = 1; c = 2; };',
+                      parser=parser, dict_factory=dict, list_factory=list,
+                      array_factory=tuple)
+    assert type(c) is dict and type(c['a']) is dict
+    assert c == {'a': {'b': [1, (2, 3), {'c': 4}], 'c': 2}}
+    assert list(c['a']) == ['b', 'c']
+
+def test_dict_factory_receives_pairs():
+    calls = []
+    def record(pairs):
+        calls.append(pairs)
+        return dict(pairs)
+    libconf.loads(u'a = { x = 1; x = 2; }; b = 3;', dict_factory=record)
+    assert calls == [[('x', 1), ('x', 2)], [('a', {'x': 2}), ('b', 3)]]
+
+def test_slim_attr_dict():
+    c = libconf.loads(u'a = { b = 1; }; c = ({ d = 2; },);',
+                      dict_factory=libconf.SlimAttrDict)
+    assert isinstance(c.a, libconf.SlimAttrDict)
+    assert c.a.b == 1 and c.c[0].d == 2
+    assert not hasattr(c, 'x')
+    with pytest.raises(AttributeError):
+        c.x = 1
+    assert libconf.loads(libconf.dumps(c)) == c
+
+def test_lazy_parser_rejects_dict_factory():
+    with pytest.raises(ValueError):
+        libconf.loads(u'a = { b = 1; };', parser=libconf.LazyParser,
+                      dict_factory=libconf.SlimAttrDict)
+    c = libconf.loads(u'a = { b = ({ c = 1; },); };', parser=libconf.LazyParser,
+                      list_factory=list)
+    assert isinstance(c.a, libconf.LazyAttrDict)
+    assert c.a.b == [{'c': 1}]
+
+
+# Tests for interning
+#####################
+
+def unique_copy(s):
+    # A string equal to s, but not identical to it or an interned string.
+    return (s + u'x')[:-1]
+
+@pytest.mark.parametrize('parser', [libconf.Parser, libconf.IterativeParser])
+def test_intern_names(parser):
+    input = u'a = ({ %s = 1; }, { %s = 2; });'
+    name1, name2 = unique_copy(u'name'), unique_copy(u'name')
+    c = libconf.loads(input % (name1, name2), parser=parser)
+    assert list(c.a[0])[0] is not list(c.a[1])[0]
+
+    c = libconf.loads(input % (name1, name2), parser=parser,
+                      intern_names=True)
+    assert list(c.a[0])[0] is list(c.a[1])[0]
+
+def test_intern_strings():
+    input = u'a = ("%s", "%s", "long-%s", "long-%s");' % (('value',) * 4)
+    c = libconf.loads(input)
+    assert c.a[0] is not c.a[1]
+
+    c = libconf.loads(input, intern_strings=5)
+    assert c.a == ('value', 'value', 'long-value', 'long-value')
+    assert c.a[0] is c.a[1]
+    assert c.a[2] is not c.a[3]
@@ -0,0 +1,91 @@
+import os
+import io
+import pytest
+
+import libconf
+
+
+CURDIR = os.path.abspath(os.path.dirname(__file__))
+
+PARSERS = [libconf.Parser, libconf.IterativeParser]
+
+CONFIG = u'''
+    database = {
+        host = "db";
+        pool = { size = 4; timeout = 2.5; };
+        replicas = ("a", "b");
+    };
+    logging = { level = "debug"; targets = [ "file", "syslog" ]; };
+    other = ( { x = [1, 2]; }, "\\x41" );
+    scalar = 3;
+'''
+
+
+# Tests for parse_selection()
+#############################
+
+def test_parse_selection():
+    assert libconf.parse_selection(['a.b', 'a.c', 'd']) == \
+        {'a': {'b': True, 'c': True}, 'd': True}
+    assert libconf.parse_selection(['a.b', 'a']) == {'a': True}
+    assert libconf.parse_selection(['a', 'a.b']) == {'a': True}
+    assert libconf.parse_selection([]) == {}
+
+
+# Tests for load(select=...)
+############################
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_select_paths(parser):
+    c = libconf.loads(CONFIG, parser=parser,
+                      select=['database.pool', 'logging'])
+
+    assert c == {'database': {'pool': {'size': 4, 'timeout': 2.5}},
+                 'logging': {'level': 'debug',
+                             'targets': ['file', 'syslog']}}
+    assert isinstance(c.database, libconf.AttrDict)
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_select_into_non_group_skips_value(parser):
+    c = libconf.loads(CONFIG, parser=parser,
+                      select=['scalar.x', 'other.x', 'database.host'])
+
+    assert c == {'database': {'host': 'db'}}
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_select_nothing(parser):
+    assert libconf.loads(CONFIG, parser=parser, select=[]) == {}
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_select_all_matches_full_load(parser):
+    c = libconf.loads(CONFIG, parser=parser,
+                      select=['database', 'logging', 'other', 'scalar'])
+
+    assert c == libconf.loads(CONFIG)
+
+def test_select_with_includes():
+    example_file = os.path.join(CURDIR, 'test_e2e.cfg')
+    with io.open(example_file, 'r', encoding='utf-8') as f:
+        c = libconf.load(f, includedir=CURDIR,
+                         select=['appconfig.sub_group.sub_sub_group'])
+
+    assert c == {'appconfig': {'sub_group': {'sub_sub_group': {
+        'yes': 'yes', 'include-works': True}}}}
+
+def test_skipped_values_are_not_converted(monkeypatch):
+    def fail(text):
+        raise AssertionError("converted skipped token %r" % (text,))
+
+    monkeypatch.setattr(libconf, 'decode_escapes', fail)
+    c = libconf.loads(CONFIG, select=['scalar'])
+
+    assert c == {'scalar': 3}
+
+@pytest.mark.parametrize('input', [
+    u'a = { b = (1, 2 }; c = 1;',
+    u'a = { b = (1, 2);',
+    u'a = ; c = 1;',
+])
+def test_skipped_values_with_unbalanced_brackets_raise(input):
+    with pytest.raises(libconf.ConfigParseError):
+        libconf.loads(input, select=['c'])
@@ -97,6 +97,23 @@ def test_location():
     assert [t.type for t in tokens] == ['integer'] * 3
     assert [(t.row, t.column) for t in tokens] == [(2, 5), (2, 9), (3, 9)]
 
+def test_location_after_block_comment():
+    tokenizer = libconf.Tokenizer("<memory>")
+
+    tokens = list(tokenizer.tokenize("/* one\n two\n three */ a\n  b"))
+
+    assert [(t.row, t.column) for t in tokens] == [(3, 11), (4, 3)]
+
+def test_location_continues_across_tokenize_calls():
+    tokenizer = libconf.Tokenizer("<memory>")
+
+    tokens = list(tokenizer.tokenize("a\n  b"))
+    tokens += list(tokenizer.tokenize(" c\nd"))
+
+    assert [(t.row, t.column) for t in tokens] == [(1, 1), (2, 3), (2, 5),
+                                                   (3, 1)]
+    assert [t.offset for t in tokens] == [0, 4, 6, 8]
+
 def test_invalid_token():
     tokenizer = libconf.Tokenizer("<memory>")
 
@@ -108,3 +125,37 @@ def test_invalid_token():
     assert 'column 9' in str(exc_info.value)
     assert '`xvz' in str(exc_info.value)
 
+
+def test_token_priority_matches_token_map():
+    texts = ["0x1FL", "0x1F", "7L", "7", "7.", ".7", "7e1", "trueish",
+             "TRUE", "name*"]
+
+    # The first token_map entry matching the whole text must win.
+    expected = []
+    for text in texts:
+        for cls, type, regex in libconf.Tokenizer.token_map:
+            m = regex.match(text)
+            if m and m.end() == len(text):
+                expected.append(type)
+                break
+
+    tokenizer = libconf.Tokenizer("<memory>")
+    tokens = list(tokenizer.tokenize(" ".join(texts)))
+
+    assert [t.type for t in tokens] == expected
+
+def test_tokens_have_no_instance_dict():
+    tokenizer = libconf.Tokenizer("<memory>")
+
+    tokens = list(tokenizer.tokenize('a 1 1.0 "s" true'))
+
+    assert not any(hasattr(t, '__dict__') for t in tokens)
+
+def test_scan_yields_compact_tuples():
+    tokenizer = libconf.Tokenizer("<memory>")
+
+    tokens = list(tokenizer.scan('a = "s";'))
+
+    assert [t[:3] for t in tokens] == [('name', 'a', 0), ('=', '=', 2),
+                                       ('string', '"s"', 4), (';', ';', 7)]
+    assert all(t[3] is tokenizer.lines for t in tokens)
@@ -0,0 +1,122 @@
+import array
+import pytest
+
+import libconf
+
+
+# Tests for loading with typed_arrays=True
+##########################################
+
+def loads(string, **kwargs):
+    return libconf.loads(string, typed_arrays=True, **kwargs)
+
+@pytest.mark.parametrize('input,typecode,values', [
+    (u'[1, 2, 0x10]', 'i', [1, 2, 16]),
+    (u'[1, 2L]', 'q', [1, 2]),
+    (u'[1, 5000000000]', 'q', [1, 5000000000]),
+    (u'[0xFFFFFFFFL, -1]', 'q', [2**32 - 1, -1]),
+    (u'[1.5, 2., 1e3]', 'd', [1.5, 2.0, 1000.0]),
+    (u'[1, 2, ]', 'i', [1, 2]),
+])
+def test_numeric_arrays_are_typed(input, typecode, values):
+    a = loads(u'a = %s;' % (input,)).a
+    assert isinstance(a, array.array)
+    assert a.typecode == typecode
+    assert a.tolist() == values
+
+@pytest.mark.parametrize('input', [
+    u'[]', u'[1, 2.5]', u'[1, "x"]', u'["x", 1]', u'[true, false]',
+    u'[99999999999999999999999]',
+])
+def test_other_arrays_are_lists(input):
+    c = loads(u'a = %s;' % (input,))
+    assert type(c.a) is list
+    assert c == libconf.loads(u'a = %s;' % (input,))
+
+def test_typed_arrays_in_nested_values():
+    c = loads(u'a = ([1, 2], { b = [1.5]; });')
+    assert c.a[0] == array.array('i', [1, 2])
+    assert c.a[1].b == array.array('d', [1.5])
+
+def test_missing_int64_typecode_falls_back_to_list(monkeypatch):
+    # Python 2's array module has no typecode 'q'.
+    class array_module(object):
+        @staticmethod
+        def array(typecode, values):
+            if typecode == 'q':
+                raise ValueError('bad typecode')
+            return array.array(typecode, values)
+
+    monkeypatch.setattr(libconf, 'array', array_module)
+    c = loads(u'a = [1, 2L]; b = [1, 2];')
+    assert type(c.a) is list
+    assert c.a == [1, 2]
+    assert c.b == array.array('i', [1, 2])
+
+@pytest.mark.parametrize('parser', [libconf.IterativeParser,
+                                    libconf.LazyParser])
+def test_typed_arrays_with_other_parsers(parser):
+    c = loads(u'a = { b = { c = [1, 2]; }; };', parser=parser)
+    assert c.a.b.c == array.array('i', [1, 2])
+
+@pytest.mark.parametrize('input', [u'a = [1, 2', u'a = [1 2];', u'a = [1, ;'])
+def test_typed_array_errors_match_untyped(input):
+    with pytest.raises(libconf.ConfigParseError) as typed_excinfo:
+        loads(input)
+    with pytest.raises(libconf.ConfigParseError) as excinfo:
+        libconf.loads(input)
+    assert str(typed_excinfo.value) == str(excinfo.value)
+
+
+# Tests for dumping typed arrays
+################################
+
+class FakeNumpyArray(object):
+    '''Minimal stand-in for numpy.ndarray'''
+    def __init__(self, kind, values, ndim=1):
+        self.dtype = type('dtype', (object,), {'kind': kind})()
+        self.values = values
+        self.ndim = ndim
+
+    def tolist(self):
+        return self.values
+
+def test_dump_typed_arrays_like_lists():
+    c = {'a': array.array('i', [1, 2]), 'b': array.array('d', [1.5, 2.0]),
+         'c': array.array('i'), 'd': array.array('l', [2**40])}
+    assert libconf.dumps(c) == libconf.dumps(
+        {'a': [1, 2], 'b': [1.5, 2.0], 'c': [], 'd': [2**40]})
+
+def test_dump_int64_typed_arrays():
+    c = {'a': array.array('q', [1, 2])}
+    assert libconf.dumps(c) == libconf.dumps({'a': [libconf.LibconfInt64(1),
+                                                    2]})
+
+def test_typed_arrays_round_trip():
+    c = loads(u'a = [1, 2]; b = [3L, 4]; c = [1.5];')
+    assert loads(libconf.dumps(c)) == c
+
+def test_dump_numpy_like_arrays():
+    c = {'a': FakeNumpyArray('i', [1, 2**40]), 'b': FakeNumpyArray('f', [.5]),
+         'c': FakeNumpyArray('b', [True])}
+    assert libconf.dumps(c) == libconf.dumps(
+        {'a': [1, 2**40], 'b': [.5], 'c': [True]})
+
+class FakeNumpyFloat(float):
+    '''Minimal stand-in for numpy.float64, a float subclass'''
+    dtype = type('dtype', (object,), {'kind': 'f'})()
+    ndim = 0
+
+    def tolist(self):
+        return float(self)
+
+def test_dump_numpy_like_scalars():
+    assert libconf.dumps({'a': FakeNumpyFloat(1.5)}) == 'a = 1.5;\n'
+    assert libconf.dumps({'a': [FakeNumpyFloat(1.5)]}) == \
+        libconf.dumps({'a': [1.5]})
+    with pytest.raises(libconf.ConfigSerializeError):
+        libconf.dumps({'a': FakeNumpyArray('i', 1, ndim=0)})
+
+def test_dump_multidimensional_numpy_like_array_raises():
+    with pytest.raises(libconf.ConfigSerializeError):
+        libconf.dumps({'a': FakeNumpyArray('i', [[1, 2], [3, 4]], ndim=2)})
@@ -0,0 +1,184 @@
+import io
+import os
+import threading
+
+import libconf
+
+
+# Helper functions
+##################
+
+def write(path, text, mtime=None):
+    with io.open(str(path), 'w', encoding='utf-8') as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+class Recorder(object):
+    def __init__(self):
+        self.calls = []
+        self.errors = []
+        self.event = threading.Event()
+
+    def __call__(self, changes, config):
+        self.calls.append((changes, config))
+        self.event.set()
+
+    def error(self, e):
+        self.errors.append(e)
+
+
+# Tests for ConfigWatcher and watch()
+#####################################
+
+def test_watcher_reports_changes(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 1;\nb = { c = "x"; d = 2; };\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.ConfigWatcher(str(path), recorder, debounce=0)
+    assert watcher.config == {'a': 1, 'b': {'c': 'x', 'd': 2}}
+
+    assert not watcher.check()
+    write(path, u'a = 5;\nb = { c = "y"; e = 3; };\n', mtime=1001)
+    assert watcher.check()
+
+    changes, config = recorder.calls.pop()
+    assert config is watcher.config and config.b.c == 'y'
+    assert changes == [
+        ('changed', ('a',), 1, 5),
+        ('removed', ('b', 'd'), 2, None),
+        ('changed', ('b', 'c'), 'x', 'y'),
+        ('added', ('b', 'e'), None, 3),
+    ]
+    assert not watcher.check()
+
+def test_watcher_skips_callback_without_changes(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 1;\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.ConfigWatcher(str(path), recorder, debounce=0)
+
+    write(path, u'a = 1; // unchanged\n', mtime=1001)
+    assert watcher.check()
+    assert recorder.calls == []
+
+def test_watcher_tracks_includes(tmpdir):
+    path = tmpdir.join('main.cfg')
+    include = tmpdir.join('inc.cfg')
+    write(path, u'a = 1;\n@include "inc.cfg"\n', mtime=1000)
+    write(include, u'b = 2;\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.ConfigWatcher(str(path), recorder,
+                                    includedir=str(tmpdir), debounce=0)
+
+    write(include, u'b = 3;\n', mtime=1001)
+    assert watcher.check()
+    assert recorder.calls[-1][0] == [('changed', ('b',), 2, 3)]
+
+    # A newly included file is watched after the next reload.
+    other = tmpdir.join('other.cfg')
+    write(other, u'c = 1;\n', mtime=1000)
+    write(include, u'@include "other.cfg"\n', mtime=1002)
+    assert watcher.check()
+    write(other, u'c = 2;\n', mtime=1001)
+    assert watcher.check()
+    assert recorder.calls[-1][0] == [('changed', ('c',), 1, 2)]
+
+def test_watcher_debounces_bursts_of_writes(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 0;\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.ConfigWatcher(str(path), recorder, debounce=0)
+    loads = []
+    watcher_load = watcher.load
+
+    def load():
+        loads.append(1)
+        return watcher_load()
+
+    def wait(timeout):
+        # Each debounce period sees another write, until the third one.
+        if len(writes) < 3:
+            writes.append(1)
+            write(path, u'a = %d;\n' % (len(writes) + 1),
+                  mtime=1001 + len(writes))
+        return False
+
+    writes = []
+    watcher.load = load
+    watcher.stopped.wait = wait
+    write(path, u'a = 1;\n', mtime=1001)
+    assert watcher.check()
+
+    assert len(loads) == 1
+    assert recorder.calls == [([('changed', ('a',), 0, 4)], {'a': 4})]
+
+def test_watcher_keeps_config_on_errors(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 1;\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.ConfigWatcher(str(path), recorder, debounce=0,
+                                    error_callback=recorder.error)
+
+    write(path, u'a = ;\n', mtime=1001)
+    assert watcher.check()
+    assert isinstance(recorder.errors.pop(), libconf.ConfigParseError)
+    assert watcher.config == {'a': 1}
+
+    os.remove(str(path))
+    assert watcher.check()
+    assert isinstance(recorder.errors.pop(), (IOError, OSError))
+
+    deep = u'a = ' + u'(' * 100000 + u')' * 100000 + u';\n'
+    write(path, deep, mtime=1002)
+    assert watcher.check()
+    assert isinstance(recorder.errors.pop(), RuntimeError)
+
+    write(path, u'a = 2;\n', mtime=1003)
+    assert watcher.check()
+    assert recorder.calls == [([('changed', ('a',), 1, 2)], {'a': 2})]
+
+def test_watch_polls_on_thread(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 1;\n', mtime=1000)
+    recorder = Recorder()
+    watcher = libconf.watch(str(path), recorder, interval=0.01,
+                            debounce=0.01)
+    try:
+        write(path, u'a = 2;\n', mtime=1001)
+        assert recorder.event.wait(5)
+    finally:
+        watcher.stop()
+
+    assert not watcher.thread.is_alive()
+    assert recorder.calls == [([('changed', ('a',), 1, 2)], {'a': 2})]
+
+def test_watch_keeps_polling_after_callback_errors(tmpdir):
+    path = tmpdir.join('main.cfg')
+    write(path, u'a = 1;\n', mtime=1000)
+    recorder = Recorder()
+
+    def callback(changes, config):
+        # A poll may see the file while it's being written.
+        if config.get('a') == 2:
+            raise ValueError('callback failed')
+        if config.get('a') == 3:
+            recorder(changes, config)
+
+    watcher = libconf.watch(str(path), callback, interval=0.01,
+                            debounce=0.01, error_callback=recorder.error)
+    try:
+        write(path, u'a = 2;\n', mtime=1001)
+        for _ in range(500):
+            if recorder.errors:
+                break
+            watcher.stopped.wait(0.01)
+        assert watcher.thread.is_alive()
+        write(path, u'a = 3;\n', mtime=1002)
+        assert recorder.event.wait(5)
+    finally:
+        watcher.stop()
+
+    assert 'callback failed' in [str(e) for e in recorder.errors]
+    assert recorder.calls[-1][1] == {'a': 3}